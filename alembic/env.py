@@ -13,12 +13,18 @@ fileConfig(config.config_file_name)
 target_metadata = Base.metadata
 
 # Use DB_PATH from environment or default
-DB_PATH = os.environ.get("DB_PATH") or "./local_data/shop.db"
+DB_PATH = get_db_path()
 config.set_main_option("sqlalchemy.url", f"sqlite:///{DB_PATH}")
 
+def include_object(object, name, type_, reflected, compare_to):
+    # The FTS5 search table and its shadow tables are managed by hand in migrations
+    if type_ == "table" and name.startswith("products_fts"):
+        return False
+    return True
+
 def run_migrations_offline():
     url = config.get_main_option("sqlalchemy.url")
-    context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True, include_object=include_object)
     with context.begin_transaction():
         context.run_migrations()
 
@@ -29,7 +35,7 @@ def run_migrations_online():
         poolclass=pool.NullPool,
     )
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
         with context.begin_transaction():
             context.run_migrations()
 
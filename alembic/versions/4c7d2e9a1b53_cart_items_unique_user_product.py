@@ -0,0 +1,40 @@
+"""cart_items unique (user_id, product_id)
+
+Revision ID: 4c7d2e9a1b53
+Revises: 95e529a73ab8
+Create Date: 2026-10-18 10:12:41.527301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '4c7d2e9a1b53'
+down_revision: Union[str, Sequence[str], None] = '95e529a73ab8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fold duplicate cart lines into the oldest row before enforcing uniqueness
+    op.execute("""
+        UPDATE cart_items
+        SET quantity = (
+            SELECT SUM(c2.quantity) FROM cart_items AS c2
+            WHERE c2.user_id = cart_items.user_id AND c2.product_id = cart_items.product_id
+        )
+        WHERE id IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id)
+    """)
+    op.execute("""
+        DELETE FROM cart_items
+        WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id)
+    """)
+    op.create_index('uq_cart_items_user_product', 'cart_items', ['user_id', 'product_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_cart_items_user_product', table_name='cart_items')
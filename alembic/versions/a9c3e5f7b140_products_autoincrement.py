@@ -0,0 +1,66 @@
+"""products.id AUTOINCREMENT so ids of deleted products are never reused
+
+Revision ID: a9c3e5f7b140
+Revises: f4a7c1e9b352
+Create Date: 2026-10-18 21:52:08.137652
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a9c3e5f7b140'
+down_revision: Union[str, Sequence[str], None] = 'f4a7c1e9b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rebuild_products(autoincrement: bool) -> None:
+    # SQLite can only add AUTOINCREMENT by copying the table. Dropping the old
+    # table drops the FTS triggers from b81f3d6c0e27 with it; the FTS index
+    # itself is keyed on the ids, which the copy keeps
+    with op.batch_alter_table('products', recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+    op.execute("""
+        CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rebuild_products(autoincrement=True)
+    # Products deleted before this migration may have had higher ids than any
+    # left; their sales rows and order lines still carry them, so start past those
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'products'")
+    op.execute("""
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'products', COALESCE(MAX(id), 0) FROM (
+            SELECT MAX(id) AS id FROM products
+            UNION ALL SELECT MAX(product_id) FROM product_sales
+            UNION ALL SELECT MAX(product_id) FROM order_items
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild_products(autoincrement=False)
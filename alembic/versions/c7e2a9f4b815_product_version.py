@@ -0,0 +1,32 @@
+"""products.version and products.updated_at for conditional GETs
+
+Revision ID: c7e2a9f4b815
+Revises: a6d4c2e8f517
+Create Date: 2026-10-18 16:40:05.227918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c7e2a9f4b815'
+down_revision: Union[str, Sequence[str], None] = 'a6d4c2e8f517'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('products', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing rows count as modified now
+    op.execute("UPDATE products SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Plain ALTER TABLE DROP COLUMN (SQLite 3.35+): a batch rebuild would drop the FTS triggers
+    op.drop_column('products', 'updated_at')
+    op.drop_column('products', 'version')
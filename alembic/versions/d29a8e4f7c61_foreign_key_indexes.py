@@ -0,0 +1,35 @@
+"""indexes for foreign keys and order history
+
+Revision ID: d29a8e4f7c61
+Revises: b81f3d6c0e27
+Create Date: 2026-10-18 11:31:05.116842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd29a8e4f7c61'
+down_revision: Union[str, Sequence[str], None] = 'b81f3d6c0e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # cart_items.user_id is already the leading column of uq_cart_items_user_product
+    op.create_index(op.f('ix_cart_items_product_id'), 'cart_items', ['product_id'], unique=False)
+    # Serves both "orders of user X" and the (created_at, id) keyset on order history
+    op.create_index('ix_orders_user_id_created_at_id', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_items_product_id'), 'order_items', ['product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_order_items_product_id'), table_name='order_items')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_index('ix_orders_user_id_created_at_id', table_name='orders')
+    op.drop_index(op.f('ix_cart_items_product_id'), table_name='cart_items')
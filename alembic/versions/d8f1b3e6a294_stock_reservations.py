@@ -0,0 +1,43 @@
+"""stock_reservations for cart stock holds
+
+Revision ID: d8f1b3e6a294
+Revises: c7e2a9f4b815
+Create Date: 2026-10-18 18:12:40.381562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd8f1b3e6a294'
+down_revision: Union[str, Sequence[str], None] = 'c7e2a9f4b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_reservations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'product_id')
+    )
+    op.create_index(op.f('ix_stock_reservations_expires_at'), 'stock_reservations', ['expires_at'], unique=False)
+    # Carts that exist already hold nothing; their lines are taken from stock at checkout
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Give held units back before the holds disappear
+    op.execute(
+        "UPDATE products SET stock = stock + ("
+        "SELECT SUM(quantity) FROM stock_reservations WHERE product_id = products.id"
+        ") WHERE id IN (SELECT product_id FROM stock_reservations)"
+    )
+    op.drop_index(op.f('ix_stock_reservations_expires_at'), table_name='stock_reservations')
+    op.drop_table('stock_reservations')
@@ -0,0 +1,65 @@
+"""sales rollups: daily_revenue and product_sales
+
+Revision ID: e5a1c7b9d342
+Revises: d29a8e4f7c61
+Create Date: 2026-10-18 12:10:42.318506
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e5a1c7b9d342'
+down_revision: Union[str, Sequence[str], None] = 'd29a8e4f7c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_revenue',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('product_sales',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_index('ix_product_sales_units', 'product_sales', ['units', 'product_id'], unique=False)
+    op.create_index('ix_product_sales_revenue', 'product_sales', ['revenue', 'product_id'], unique=False)
+
+    # Backfill from existing order history (same queries as app.analytics.rebuild)
+    op.execute("""
+        INSERT INTO daily_revenue (day, orders, units, revenue)
+        SELECT o.day, o.orders, COALESCE(i.units, 0), o.revenue
+        FROM (
+            SELECT date(created_at) AS day, COUNT(*) AS orders, SUM(total_amount) AS revenue
+            FROM orders GROUP BY date(created_at)
+        ) AS o
+        LEFT JOIN (
+            SELECT date(orders.created_at) AS day, SUM(order_items.quantity) AS units
+            FROM order_items JOIN orders ON orders.id = order_items.order_id
+            GROUP BY date(orders.created_at)
+        ) AS i ON i.day = o.day
+    """)
+    op.execute("""
+        INSERT INTO product_sales (product_id, orders, units, revenue)
+        SELECT product_id, COUNT(DISTINCT order_id), SUM(quantity), SUM(price * quantity)
+        FROM order_items WHERE product_id IS NOT NULL GROUP BY product_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_sales_revenue', table_name='product_sales')
+    op.drop_index('ix_product_sales_units', table_name='product_sales')
+    op.drop_table('product_sales')
+    op.drop_table('daily_revenue')
@@ -0,0 +1,27 @@
+"""stock_reservations.product_id index for dropping a deleted product's holds
+
+Revision ID: f4a7c1e9b352
+Revises: e2c9a7d4f603
+Create Date: 2026-10-18 21:14:36.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f4a7c1e9b352'
+down_revision: Union[str, Sequence[str], None] = 'e2c9a7d4f603'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_stock_reservations_product_id'), 'stock_reservations', ['product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stock_reservations_product_id'), table_name='stock_reservations')
@@ -0,0 +1,111 @@
+"""
+Sales rollups: daily_revenue and product_sales.
+
+Checkout calls record_order() inside its own transaction, so the rollups
+move together with the orders they summarize. rebuild() recomputes both
+tables from orders and order_items, for backfills or after manual edits.
+Deleting a product nulls order_items.product_id, so a deleted product's
+product_sales row cannot be recomputed; rebuild() keeps it as it is:
+
+    python -m app.analytics rebuild
+"""
+import argparse
+from datetime import date
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .models import DailyRevenue, ProductSales
+
+
+def record_order(db: Session, day: date, total_amount: float, lines: dict[int, tuple[int, float]]) -> None:
+    """
+    Add one order to the rollups. lines maps product_id to (quantity, unit price).
+    Does not commit.
+    """
+    # Checkout validates quantities; a non-positive one here would corrupt the totals
+    invalid = sorted(product_id for product_id, (quantity, _) in lines.items() if quantity <= 0)
+    if invalid:
+        raise ValueError(f"non-positive quantities for products {invalid}")
+    stmt = sqlite_insert(DailyRevenue)
+    db.execute(
+        stmt.values(day=day, orders=1, units=sum(q for q, _ in lines.values()), revenue=total_amount)
+        .on_conflict_do_update(
+            index_elements=[DailyRevenue.day],
+            set_={
+                "orders": DailyRevenue.orders + stmt.excluded.orders,
+                "units": DailyRevenue.units + stmt.excluded.units,
+                "revenue": DailyRevenue.revenue + stmt.excluded.revenue,
+            }
+        )
+    )
+
+    stmt = sqlite_insert(ProductSales)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ProductSales.product_id],
+            set_={
+                "orders": ProductSales.orders + stmt.excluded.orders,
+                "units": ProductSales.units + stmt.excluded.units,
+                "revenue": ProductSales.revenue + stmt.excluded.revenue,
+            }
+        ),
+        [
+            {"product_id": product_id, "orders": 1, "units": quantity, "revenue": price * quantity}
+            for product_id, (quantity, price) in lines.items()
+        ]
+    )
+
+
+def rebuild(db: Session) -> dict:
+    """
+    Recompute both rollups from order history in one transaction. Rows of
+    deleted products, whose order lines no longer name them, are kept.
+    """
+    db.execute(delete(DailyRevenue))
+    db.execute(text("""
+        DELETE FROM product_sales
+        WHERE product_id IN (SELECT id FROM products)
+           OR product_id IN (SELECT product_id FROM order_items WHERE product_id IS NOT NULL)
+    """))
+    # Orders and units are aggregated separately so items do not multiply order totals
+    db.execute(text("""
+        INSERT INTO daily_revenue (day, orders, units, revenue)
+        SELECT o.day, o.orders, COALESCE(i.units, 0), o.revenue
+        FROM (
+            SELECT date(created_at) AS day, COUNT(*) AS orders, SUM(total_amount) AS revenue
+            FROM orders GROUP BY date(created_at)
+        ) AS o
+        LEFT JOIN (
+            SELECT date(orders.created_at) AS day, SUM(order_items.quantity) AS units
+            FROM order_items JOIN orders ON orders.id = order_items.order_id
+            GROUP BY date(orders.created_at)
+        ) AS i ON i.day = o.day
+    """))
+    db.execute(text("""
+        INSERT INTO product_sales (product_id, orders, units, revenue)
+        SELECT product_id, COUNT(DISTINCT order_id), SUM(quantity), SUM(price * quantity)
+        FROM order_items WHERE product_id IS NOT NULL GROUP BY product_id
+    """))
+    db.commit()
+    return {
+        "days": db.query(DailyRevenue).count(),
+        "products": db.query(ProductSales).count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.analytics", description="Sales rollup maintenance")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: recompute the rollups from order history")
+    parser.parse_args()
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        counts = rebuild(db)
+    print(f"rebuilt rollups: {counts['days']} days, {counts['products']} products")
+
+
+if __name__ == "__main__":
+    main()
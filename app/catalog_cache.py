@@ -0,0 +1,150 @@
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .config import (
+    CATALOG_CACHE_ENABLED, CATALOG_CACHE_MAXSIZE, CATALOG_CACHE_PAGES, CATALOG_CACHE_TTL_SECONDS
+)
+from .models import Product
+from .schemas import CatalogProduct, ProductPage
+from .utils.cache import TTLCache
+from .utils.pagination import keyset_page
+
+
+class CatalogCache:
+    """
+    Read-through cache of the product catalog.
+
+    Per-id entries hold CatalogProduct snapshots; page snapshots hold only the ids
+    (and next cursor) of a keyset page, so a price or stock change evicts just
+    the affected ids. Every write bumps `generation`; a fill that started
+    before a write is discarded instead of caching pre-write data.
+    """
+
+    def __init__(self, maxsize: int, page_maxsize: int, ttl: float, enabled: bool = True):
+        self.enabled = enabled
+        self.generation = 0
+        self.products = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.pages = TTLCache(maxsize=page_maxsize, ttl=ttl)
+        self._routes = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._lock = threading.Lock()
+
+    # ----------------------------
+    # Reads
+    # ----------------------------
+    def get_product(self, db: Session, product_id: int, route: str) -> Optional[CatalogProduct]:
+        return self.get_products(db, [product_id], route).get(product_id)
+
+    def get_products(self, db: Session, product_ids: Iterable[int], route: Optional[str]) -> dict[int, CatalogProduct]:
+        """
+        Look up many products; misses are loaded with a single IN query.
+        Hits and misses are counted against `route` unless it is None.
+        """
+        product_ids = list(product_ids)
+        found: dict[int, CatalogProduct] = {}
+        missing = []
+        for product_id in product_ids:
+            product = self.products.get(product_id) if self.enabled else None
+            if product is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = product
+
+        if missing:
+            generation = self.generation
+            for row in db.execute(_product_columns().where(Product.id.in_(missing))).mappings():
+                product = CatalogProduct(**row)
+                found[product.id] = product
+                self._store(self.products, product.id, product, generation)
+
+        self._record(route, hits=len(product_ids) - len(missing), misses=len(missing))
+        return found
+
+    def get_page(self, db: Session, limit: int, after: Optional[int], route: str) -> ProductPage:
+        key = (after, limit)
+        snapshot = self.pages.get(key) if self.enabled else None
+        if snapshot is not None:
+            self._record(route, hits=1, misses=0)
+            ids, next_cursor = snapshot
+            products = self.get_products(db, ids, route=None)
+            return ProductPage(items=[products[i] for i in ids if i in products], next_cursor=next_cursor)
+
+        self._record(route, hits=0, misses=1)
+        generation = self.generation
+        stmt = _product_columns().order_by(Product.id)
+        if after is not None:
+            stmt = stmt.where(Product.id > after)
+
+        rows, next_cursor = keyset_page(
+            db.execute(stmt.limit(limit + 1)).mappings().all(), limit, lambda row: row["id"]
+        )
+
+        items = [CatalogProduct(**row) for row in rows]
+        for product in items:
+            self._store(self.products, product.id, product, generation)
+        self._store(self.pages, key, ([p.id for p in items], next_cursor), generation)
+        return ProductPage(items=items, next_cursor=next_cursor)
+
+    # ----------------------------
+    # Writes
+    # ----------------------------
+    def invalidate(self, product_ids: Iterable[int] = (), membership_changed: bool = False) -> None:
+        """
+        Call after committing a catalog write. Pass membership_changed when
+        products were created or deleted, which invalidates every page snapshot.
+        """
+        with self._lock:
+            self.generation += 1
+        for product_id in product_ids:
+            self.products.invalidate(product_id)
+        if membership_changed:
+            self.pages.clear()
+
+    def _store(self, cache: TTLCache, key, value, generation: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation == self.generation:
+                cache.set(key, value)
+
+    # ----------------------------
+    # Stats
+    # ----------------------------
+    def _record(self, route: Optional[str], hits: int, misses: int) -> None:
+        if route is None:
+            return
+        with self._lock:
+            self._routes[route]["hits"] += hits
+            self._routes[route]["misses"] += misses
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, counts in self._routes.items():
+                total = counts["hits"] + counts["misses"]
+                routes[route] = {**counts, "hit_rate": counts["hits"] / total if total else 0.0}
+        return {
+            "enabled": self.enabled,
+            "generation": self.generation,
+            "products": self.products.stats(),
+            "pages": self.pages.stats(),
+            "routes": routes,
+        }
+
+
+def _product_columns():
+    # Column projection: no ORM instances or identity-map bookkeeping per row
+    return select(
+        Product.id, Product.name, Product.description, Product.price, Product.stock, Product.version, Product.updated_at
+    )
+
+
+catalog_cache = CatalogCache(
+    maxsize=CATALOG_CACHE_MAXSIZE,
+    page_maxsize=CATALOG_CACHE_PAGES,
+    ttl=CATALOG_CACHE_TTL_SECONDS,
+    enabled=CATALOG_CACHE_ENABLED,
+)
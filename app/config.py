@@ -1,11 +1,124 @@
 import os
 
-LOCAL_DB_PATH = "/Users/smruti/Dev/2mpattanaik/ecommerce_rest_api/local_data/shop.db"
+LOCAL_DB_PATH = "./local_data/shop.db"
 DOCKER_DB_PATH = "/data/shop.db"
 SECRET_KEY = "supersecret"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# SQLite engine profile. "production" applies the pragmas and pool sizing below
+# on every connection; "default" keeps SQLAlchemy/SQLite defaults (for benchmarks).
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_FOREIGN_KEYS = os.getenv("DB_FOREIGN_KEYS", "1") == "1"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Async database path: routes run their queries on the event loop through an
+# async driver instead of holding a threadpool worker. DB_ASYNC_URL overrides
+# the aiosqlite URL derived from the DB path (e.g. postgresql+asyncpg://...).
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+DB_ASYNC_URL = os.getenv("DB_ASYNC_URL")
+
+# Write path. "direct": every write route commits on its own session.
+# "serialized" (SQLite only): write units are queued for one writer thread
+# that group-commits up to DB_WRITE_MAX_BATCH of them per transaction, waiting
+# at most DB_WRITE_MAX_WAIT_MS for more to arrive (0 = only what is queued).
+DB_WRITE_MODE = os.getenv("DB_WRITE_MODE", "direct")
+DB_WRITE_MAX_BATCH = int(os.getenv("DB_WRITE_MAX_BATCH", "256"))
+DB_WRITE_MAX_WAIT_MS = float(os.getenv("DB_WRITE_MAX_WAIT_MS", "0"))
+
+# Read-only sessions for routes that only read. By default they open the same
+# SQLite file with mode=ro; DB_READ_URL / DB_READ_ASYNC_URL point them at a
+# replica instead. DB_READ_POOL_SIZE bounds the read-only pool.
+DB_READ_URL = os.getenv("DB_READ_URL")
+DB_READ_ASYNC_URL = os.getenv("DB_READ_ASYNC_URL")
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "20"))
+
+# Product listing: keyset page sizes and NDJSON streaming chunk size
+PRODUCTS_PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", "50"))
+PRODUCTS_MAX_PAGE_SIZE = int(os.getenv("PRODUCTS_MAX_PAGE_SIZE", "500"))
+PRODUCTS_STREAM_CHUNK_SIZE = int(os.getenv("PRODUCTS_STREAM_CHUNK_SIZE", "1000"))
+
+# Product search page sizes
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "100"))
+
+# Bulk product import: rows per transaction and how many row errors to report
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+
+# In-process product catalog cache (per-id entries and keyset page snapshots)
+CATALOG_CACHE_ENABLED = os.getenv("CATALOG_CACHE_ENABLED", "1") == "1"
+CATALOG_CACHE_MAXSIZE = int(os.getenv("CATALOG_CACHE_MAXSIZE", "50000"))
+CATALOG_CACHE_PAGES = int(os.getenv("CATALOG_CACHE_PAGES", "1000"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "600"))
+
+# Order history page sizes
+ORDERS_PAGE_SIZE = int(os.getenv("ORDERS_PAGE_SIZE", "20"))
+ORDERS_MAX_PAGE_SIZE = int(os.getenv("ORDERS_MAX_PAGE_SIZE", "100"))
+
+# Sales analytics: default revenue window and the largest window / top-N allowed
+ANALYTICS_DEFAULT_DAYS = int(os.getenv("ANALYTICS_DEFAULT_DAYS", "30"))
+ANALYTICS_MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", "366"))
+ANALYTICS_MAX_TOP = int(os.getenv("ANALYTICS_MAX_TOP", "100"))
+
+# Idempotency-Key responses for cart writes and checkout: how long a key is
+# honoured, and how often expired keys are deleted (checked on each save)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "60"))
+
+# Order-events outbox worker: started with the app unless OUTBOX_WORKER_ENABLED=0.
+# Events are claimed in batches and leased so a crashed worker's events are
+# retried; failures back off exponentially until OUTBOX_MAX_ATTEMPTS.
+OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "1") == "1"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "1"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "300"))
+
+# Cart stock holds (app/inventory.py): a hold lasts CART_HOLD_TTL_SECONDS after
+# the user's last cart change; expired holds are returned to stock at most once
+# per STOCK_SWEEP_INTERVAL_SECONDS. Taking stock retries a lost version
+# compare-and-swap up to STOCK_CAS_RETRIES times before answering 409.
+CART_HOLD_TTL_SECONDS = int(os.getenv("CART_HOLD_TTL_SECONDS", str(15 * 60)))
+STOCK_SWEEP_INTERVAL_SECONDS = float(os.getenv("STOCK_SWEEP_INTERVAL_SECONDS", "30"))
+STOCK_CAS_RETRIES = int(os.getenv("STOCK_CAS_RETRIES", "8"))
+
+# Access-token revocation (app/revocation.py): how often each process reloads
+# revoked token ids stored by others (0: only at startup), and how often rows
+# of tokens that have expired anyway are deleted (checked on each revoke)
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+REVOCATION_PURGE_INTERVAL_SECONDS = float(os.getenv("REVOCATION_PURGE_INTERVAL_SECONDS", "300"))
+
+# Authenticated-user cache used by get_current_user
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "1") == "1"
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+
+# Verified-token cache used by decode_access_token (entries never outlive the token's exp)
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "1") == "1"
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))
+
+# Gzip for responses of at least GZIP_MINIMUM_SIZE bytes when the client accepts it
+GZIP_ENABLED = os.getenv("GZIP_ENABLED", "1") == "1"
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "6"))
+
+# Request metrics (/metrics, Server-Timing) and the slow-query log (0 disables it)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+# Dedicated pool for bcrypt hashing/verification, kept off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 def running_in_docker() -> bool:
     return os.path.exists("/.dockerenv")
 
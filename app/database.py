@@ -1,18 +1,150 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 import os
 
+from .config import (
+    get_db_path, DB_PROFILE, DB_JOURNAL_MODE, DB_SYNCHRONOUS, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE, DB_FOREIGN_KEYS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_ASYNC, DB_ASYNC_URL,
+    DB_READ_URL, DB_READ_ASYNC_URL, DB_READ_POOL_SIZE,
+)
+from .metrics import instrument_engine
+
 # Determine DB path
-DB_PATH = os.environ.get("DB_PATH") or "./local_data/shop.db"
+DB_PATH = get_db_path()
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+ASYNC_DATABASE_URL = DB_ASYNC_URL or f"sqlite+aiosqlite:///{DB_PATH}"
+# Read-only connections to the same file (SQLite URI filename, mode=ro)
+READ_DATABASE_URL = DB_READ_URL or f"sqlite:///file:{DB_PATH}?mode=ro&uri=true"
+ASYNC_READ_DATABASE_URL = DB_READ_ASYNC_URL or f"sqlite+aiosqlite:///file:{DB_PATH}?mode=ro&uri=true"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    # Per-connection settings; journal_mode=WAL is persistent but cheap to re-assert
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={DB_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA foreign_keys={'ON' if DB_FOREIGN_KEYS else 'OFF'}")
+    cursor.close()
+
+
+def _apply_sqlite_read_pragmas(dbapi_connection, connection_record):
+    # Read-only connections: no journal/synchronous settings to assert, and
+    # query_only turns any stray write into an error
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = DB_PROFILE):
+    """
+    Build a SQLite engine for the given profile ("production" or "default")
+    """
+    if profile == "default":
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    event.listen(db_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL):
+    """
+    Build the async engine; SQLite URLs get the same pragmas as the sync profile
+    """
+    db_engine = create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    if db_engine.dialect.name == "sqlite" and DB_PROFILE != "default":
+        event.listen(db_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+
+def create_read_engine(url: str = READ_DATABASE_URL, async_: bool = False):
+    """
+    Build the engine behind read-only sessions. Connections run in
+    autocommit: a read needs no BEGIN, and returning a connection to the
+    pool skips the ROLLBACK.
+    """
+    options = dict(
+        isolation_level="AUTOCOMMIT",
+        pool_reset_on_return=None,
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    if async_:
+        db_engine = create_async_engine(url, **options)
+        sync_engine = db_engine.sync_engine
+    else:
+        if url.startswith("sqlite"):
+            options["connect_args"] = {"check_same_thread": False}
+        db_engine = sync_engine = create_engine(url, **options)
+    if sync_engine.dialect.name == "sqlite" and DB_PROFILE != "default":
+        event.listen(sync_engine, "connect", _apply_sqlite_read_pragmas)
+    return db_engine
+
+
+os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
+engine = create_db_engine()
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Read-only engines are built on first use, like the async engine below, so
+# nothing tries to open the file read-only before migrations have created it
+_read_sessionmaker = None
+_async_read_sessionmaker = None
+
+
+def ReadSessionLocal():
+    global _read_sessionmaker
+    if _read_sessionmaker is None:
+        read_engine = create_read_engine()
+        instrument_engine(read_engine)
+        _read_sessionmaker = sessionmaker(autoflush=False, expire_on_commit=False, bind=read_engine)
+    return _read_sessionmaker()
+
+# The async engine is only built on first use so the sync path needs no async driver
+_async_sessionmaker = None
+
+
+def AsyncSessionLocal():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        # Objects stay usable after commit; refreshing them would need IO outside run_sync
+        async_engine = create_async_db_engine()
+        instrument_engine(async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker()
+
+
+def AsyncReadSessionLocal():
+    global _async_read_sessionmaker
+    if _async_read_sessionmaker is None:
+        async_read_engine = create_read_engine(ASYNC_READ_DATABASE_URL, async_=True)
+        instrument_engine(async_read_engine.sync_engine)
+        _async_read_sessionmaker = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+    return _async_read_sessionmaker()
+
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -20,3 +152,45 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    db = AsyncReadSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# Session dependencies used by the routers; DB_ASYNC selects the async path.
+# Routes that only read take get_read_session (read-only pool), everything
+# else get_write_session.
+get_write_session = get_async_db if DB_ASYNC else get_db
+get_read_session = get_async_read_db if DB_ASYNC else get_read_db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run fn(session, *args, **kwargs), a plain synchronous unit of database work.
+    Async sessions run it on the event loop via run_sync; sync sessions run it
+    in the threadpool, which is what a plain `def` route would do.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -1,15 +1,55 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from .config import USER_CACHE_ENABLED, USER_CACHE_MAXSIZE, USER_CACHE_TTL_SECONDS
+from .database import get_read_session, run_db
+from .metrics import timed
 from .models import User
+from .revocation import denylist
+from .utils.cache import TTLCache
 from .utils.jwt import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Column snapshots of recently authenticated users, keyed by user id
+user_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User):
+    user_cache.invalidate(target.id)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    payload = decode_access_token(token)
+
+def _load_user(db: Session, user_id: int) -> Optional[User]:
+    if USER_CACHE_ENABLED:
+        snapshot = user_cache.get(user_id)
+        if snapshot is not None:
+            # Attach a clean instance to this session without a SELECT
+            user = User(**snapshot)
+            make_transient_to_detached(user)
+            return db.merge(user, load=False)
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user and USER_CACHE_ENABLED:
+        user_cache.set(user_id, {
+            "id": user.id,
+            "email": user.email,
+            "hashed_password": user.hashed_password,
+        })
+    return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_session)) -> User:
+    with timed("jwt"):
+        payload = decode_access_token(token)
+        # Checked on every request, token-cache hits included; no query
+        if payload.get("jti") in denylist:
+            raise HTTPException(status_code=401, detail="Token has been revoked")
 
     # This is actually the user ID based on your auth.py
     user_id: str = payload.get("sub")
@@ -18,9 +58,8 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise HTTPException(status_code=401, detail="Invalid authentication token")
 
     # Query by ID, not Email
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await run_db(db, _load_user, int(user_id))
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
-
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+from .models import IdempotencyRecord
+from .utils.serialization import FastJSONResponse
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyRequest(NamedTuple):
+    user_id: int
+    key: str
+    fingerprint: str  # SHA-256 of method, path and body
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: str
+
+
+# ----------------------------
+# Store (called inside the route's unit of work)
+# ----------------------------
+def lookup(db: Session, idem: IdempotencyRequest) -> Optional[StoredResponse]:
+    """
+    Return the stored response for a live key, or None. Raises 422 if the key
+    was first used with a different request.
+    """
+    row = db.execute(
+        select(IdempotencyRecord.fingerprint, IdempotencyRecord.status_code, IdempotencyRecord.response_body)
+        .where(
+            IdempotencyRecord.user_id == idem.user_id,
+            IdempotencyRecord.key == idem.key,
+            IdempotencyRecord.expires_at > datetime.now(timezone.utc),
+        )
+    ).first()
+    if row is None:
+        return None
+    if row.fingerprint != idem.fingerprint:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+    return StoredResponse(row.status_code, row.response_body)
+
+
+_last_purge = 0.0
+
+
+def save(db: Session, idem: IdempotencyRequest, response: BaseModel, status_code: int = 200) -> Optional[StoredResponse]:
+    """
+    Store the response in the caller's transaction, just before it commits.
+
+    If another request committed the same key first, the transaction is
+    rolled back and that request's stored response is returned instead; the
+    caller must return it without committing.
+    """
+    global _last_purge
+    now = datetime.now(timezone.utc)
+    if time.monotonic() - _last_purge > IDEMPOTENCY_PURGE_INTERVAL_SECONDS:
+        _last_purge = time.monotonic()
+        db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= now))
+
+    stmt = sqlite_insert(IdempotencyRecord).values(
+        user_id=idem.user_id,
+        key=idem.key,
+        fingerprint=idem.fingerprint,
+        status_code=status_code,
+        response_body=response.model_dump_json(),
+        created_at=now,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    )
+    # An expired record is overwritten; a live one means we lost the race
+    result = db.execute(stmt.on_conflict_do_update(
+        index_elements=[IdempotencyRecord.user_id, IdempotencyRecord.key],
+        set_={c: stmt.excluded[c] for c in ("fingerprint", "status_code", "response_body", "created_at", "expires_at")},
+        where=IdempotencyRecord.expires_at <= now,
+    ))
+    if result.rowcount:
+        return None
+
+    db.rollback()
+    return lookup(db, idem)
+
+
+# ----------------------------
+# Route wrapper
+# ----------------------------
+# Requests currently running per (user_id, key): (fingerprint, future result)
+_inflight: dict[tuple[int, str], tuple[str, asyncio.Future]] = {}
+
+
+async def idempotent(
+    request: Request,
+    user_id: int,
+    run: Callable[[Optional[IdempotencyRequest]], Awaitable[Any]]
+):
+    """
+    Run run(idem) at most once per Idempotency-Key.
+
+    Without the header, run(None) is called as usual. A retry of a completed
+    request gets the stored response back without calling run; a duplicate
+    arriving while the first is still running waits for it and shares its
+    result. Only successful responses are stored, so a failed request can be
+    retried with the same key.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return await run(None)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode("utf-8"))
+    digest.update(await request.body())
+    idem = IdempotencyRequest(user_id, key, digest.hexdigest())
+
+    slot = (user_id, key)
+    running = _inflight.get(slot)
+    if running is not None:
+        fingerprint, future = running
+        if fingerprint != idem.fingerprint:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+        return _replayed(await asyncio.shield(future))
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[slot] = (idem.fingerprint, future)
+    try:
+        result = await run(idem)
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when no duplicate was waiting
+        raise
+    else:
+        future.set_result(result)
+    finally:
+        del _inflight[slot]
+    return _replayed(result) if isinstance(result, StoredResponse) else result
+
+
+def _replayed(result) -> Response:
+    headers = {REPLAYED_HEADER: "true"}
+    if isinstance(result, StoredResponse):
+        return Response(result.body, status_code=result.status_code, media_type="application/json", headers=headers)
+    return FastJSONResponse(result, headers=headers)
@@ -0,0 +1,216 @@
+"""
+Stock holds for carts.
+
+Adding to the cart takes a hold: the units leave products.stock at once and
+are recorded in stock_reservations. products.stock is therefore always what
+is still available, and checking out a held line never touches the product
+row. Holds expire CART_HOLD_TTL_SECONDS after the user's last cart change;
+release_expired() gives their units back. The cart routes run it in a unit
+of its own before taking stock (when sweep_due() says so), so a request
+that then fails with 409 does not roll the sweep back with it.
+
+Taking stock is a compare-and-swap on products.version: read stock and
+version, then UPDATE ... WHERE version = <what was read>. If another writer
+got in between, the UPDATE matches nothing and the read is retried, at most
+STOCK_CAS_RETRIES times. No row is locked between the read and the write.
+
+Functions here do not commit. They return the ids of products whose stock
+changed, so the caller can invalidate the catalog cache after its commit.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .config import CART_HOLD_TTL_SECONDS, STOCK_SWEEP_INTERVAL_SECONDS, STOCK_CAS_RETRIES
+from .models import Product, StockReservation
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cas_retries = 0
+        self.cas_exhausted = 0
+        self.holds_expired = 0
+
+    def add(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + n)
+
+
+stats = _Stats()
+
+
+# ----------------------------
+# Stock moves
+# ----------------------------
+def take_stock(db: Session, product_id: int, quantity: int) -> None:
+    """
+    Remove quantity units from stock by version CAS. Raises 409 when there
+    is not enough stock, or when every retry lost the race.
+    """
+    if quantity <= 0:
+        raise ValueError(f"cannot take {quantity} units of product {product_id}")
+    for _ in range(STOCK_CAS_RETRIES):
+        row = db.execute(select(Product.stock, Product.version).where(Product.id == product_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        if row.stock < quantity:
+            raise HTTPException(status_code=409, detail="Insufficient stock")
+        result = db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.version == row.version)
+            .values(stock=row.stock - quantity, version=row.version + 1, updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return
+        stats.add("cas_retries")
+    stats.add("cas_exhausted")
+    raise HTTPException(status_code=409, detail="Stock is changing too quickly, please retry")
+
+
+def return_stock(db: Session, quantities: dict[int, int]) -> None:
+    # Adding stock cannot fail, so it needs no CAS; it still bumps the version
+    _check_positive(quantities)
+    for product_id, quantity in quantities.items():
+        db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(stock=Product.stock + quantity, version=Product.version + 1, updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+
+
+# ----------------------------
+# Holds
+# ----------------------------
+def hold(db: Session, user_id: int, quantities: dict[int, int]) -> list[int]:
+    """
+    Make the user's holds match their new cart quantities (product_id ->
+    quantity) and restart the expiry clock on all of their holds.
+    """
+    invalid = sorted(product_id for product_id, quantity in quantities.items() if quantity < 0)
+    if invalid:
+        raise ValueError(f"negative hold quantities for products {invalid}")
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=CART_HOLD_TTL_SECONDS)
+    held = dict(db.execute(
+        select(StockReservation.product_id, StockReservation.quantity)
+        .where(StockReservation.user_id == user_id, StockReservation.product_id.in_(quantities))
+    ).all())
+
+    changed = []
+    returned = {}
+    for product_id, quantity in sorted(quantities.items()):
+        delta = quantity - held.get(product_id, 0)
+        if delta > 0:
+            take_stock(db, product_id, delta)
+        elif delta < 0:
+            returned[product_id] = -delta
+        if delta:
+            changed.append(product_id)
+    return_stock(db, returned)
+
+    stmt = sqlite_insert(StockReservation)
+    rows = [
+        {"user_id": user_id, "product_id": product_id, "quantity": quantity, "expires_at": expires_at}
+        for product_id, quantity in quantities.items() if quantity > 0
+    ]
+    if rows:
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[StockReservation.user_id, StockReservation.product_id],
+                set_={"quantity": stmt.excluded.quantity, "expires_at": stmt.excluded.expires_at}
+            ),
+            rows
+        )
+    emptied = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+    if emptied:
+        db.execute(delete(StockReservation).where(
+            StockReservation.user_id == user_id, StockReservation.product_id.in_(emptied)
+        ))
+    db.execute(
+        update(StockReservation)
+        .where(StockReservation.user_id == user_id)
+        .values(expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    return changed
+
+
+def consume(db: Session, user_id: int, quantities: dict[int, int]) -> tuple[dict[int, int], list[int]]:
+    """
+    For checkout: turn the user's holds into sold units. Returns the
+    quantities that were not covered by a hold (still to be taken from
+    stock) and the products whose stock changed here. Holds the cart no
+    longer needs go back to stock.
+    """
+    _check_positive(quantities)
+    held: dict[int, int] = dict(db.execute(
+        delete(StockReservation)
+        .where(StockReservation.user_id == user_id)
+        .returning(StockReservation.product_id, StockReservation.quantity)
+    ).all())
+
+    unheld = {}
+    surplus = {}
+    for product_id in set(quantities) | set(held):
+        delta = quantities.get(product_id, 0) - held.get(product_id, 0)
+        if delta > 0:
+            unheld[product_id] = delta
+        elif delta < 0:
+            surplus[product_id] = -delta
+    return_stock(db, surplus)
+    return unheld, list(surplus)
+
+
+def _check_positive(quantities: dict[int, int]) -> None:
+    # A non-positive amount would move stock the wrong way
+    invalid = sorted(product_id for product_id, quantity in quantities.items() if quantity <= 0)
+    if invalid:
+        raise ValueError(f"non-positive quantities for products {invalid}")
+
+
+def release_expired(db: Session) -> list[int]:
+    """
+    Return the units of every expired hold to stock
+    """
+    expired = db.execute(
+        delete(StockReservation)
+        .where(StockReservation.expires_at <= datetime.now(timezone.utc))
+        .returning(StockReservation.product_id, StockReservation.quantity)
+    ).all()
+    returned: dict[int, int] = defaultdict(int)
+    for product_id, quantity in expired:
+        returned[product_id] += quantity
+    return_stock(db, returned)
+    stats.add("holds_expired", len(expired))
+    return list(returned)
+
+
+_last_sweep = 0.0
+
+
+def sweep_due() -> bool:
+    # Piggybacks on cart writes, at most once per STOCK_SWEEP_INTERVAL_SECONDS per process
+    global _last_sweep
+    if time.monotonic() - _last_sweep < STOCK_SWEEP_INTERVAL_SECONDS:
+        return False
+    _last_sweep = time.monotonic()
+    return True
+
+
+def metrics() -> Iterable[str]:
+    yield "# TYPE stock_cas_retries_total counter"
+    yield f"stock_cas_retries_total {stats.cas_retries}"
+    yield "# TYPE stock_cas_exhausted_total counter"
+    yield f"stock_cas_exhausted_total {stats.cas_exhausted}"
+    yield "# TYPE stock_holds_expired_total counter"
+    yield f"stock_holds_expired_total {stats.holds_expired}"
@@ -1,10 +1,97 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .routers import users, auth, cart, products
+from fastapi.middleware.gzip import GZipMiddleware
+
+from .config import (
+    METRICS_ENABLED, OUTBOX_WORKER_ENABLED, GZIP_ENABLED, GZIP_MINIMUM_SIZE, GZIP_COMPRESS_LEVEL,
+)
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Routers, and with them the ORM models, JWT and
+    password hashing, are imported here rather than when app.main is
+    imported. Migrations are not run here; see RUN_MIGRATIONS in the
+    Dockerfile. The outbox worker and the revoked-token refresh run for
+    the lifetime of the app.
+    """
+    from . import inventory
+    from .metrics import MetricsMiddleware, metrics
+    from .outbox import worker
+    from .revocation import denylist
+    from .write_queue import writer
+    from .routers import users, auth, cart, products, analytics, metrics as metrics_router
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Revoked tokens are loaded before the first request is served
+        await denylist.start()
+        if OUTBOX_WORKER_ENABLED:
+            worker.start()
+        try:
+            yield
+        finally:
+            await worker.stop()
+            await denylist.stop()
+            if writer is not None:
+                await asyncio.to_thread(writer.stop)
+
+    app = FastAPI(title="Mana's-commerce API", lifespan=lifespan)
+
+    # Added last is outermost: metrics time the whole request, compression included
+    if GZIP_ENABLED:
+        app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    # Include routers
+    app.include_router(users.router)
+    app.include_router(auth.router)
+    app.include_router(cart.router)
+    app.include_router(products.router)
+    app.include_router(analytics.router)
+    if METRICS_ENABLED:
+        app.include_router(metrics_router.router)
+        metrics.add_collector(_cache_metrics)
+        metrics.add_collector(inventory.metrics)
+        metrics.add_collector(denylist.metrics)
+        if OUTBOX_WORKER_ENABLED:
+            metrics.add_collector(worker.metrics)
+        if writer is not None:
+            metrics.add_collector(writer.metrics)
+
+    return app
+
+
+def _cache_metrics():
+    from .catalog_cache import catalog_cache
+    from .dependencies import user_cache
+    from .utils.jwt import token_cache
+
+    caches = {
+        "user": user_cache.stats(),
+        "token": token_cache.stats(),
+        "catalog_products": catalog_cache.products.stats(),
+        "catalog_pages": catalog_cache.pages.stats(),
+    }
+    yield "# TYPE cache_hits_total counter"
+    for name, stats in caches.items():
+        yield f'cache_hits_total{{cache="{name}"}} {stats["hits"]}'
+    yield "# TYPE cache_misses_total counter"
+    for name, stats in caches.items():
+        yield f'cache_misses_total{{cache="{name}"}} {stats["misses"]}'
+    yield "# TYPE cache_entries gauge"
+    for name, stats in caches.items():
+        yield f'cache_entries{{cache="{name}"}} {stats["size"]}'
 
-app = FastAPI(title="Mana's-commerce API")
 
-# Include routers
-app.include_router(users.router)
-app.include_router(auth.router)
-app.include_router(cart.router)
-app.include_router(products.router)
+def __getattr__(name: str):
+    # `uvicorn app.main:app` and `from app.main import app` still work: the
+    # module-level app is built on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
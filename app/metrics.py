@@ -0,0 +1,238 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event
+
+from .config import METRICS_ENABLED, SLOW_QUERY_MS
+
+slow_query_logger = logging.getLogger("app.slow_query")
+
+# Latency buckets in seconds, shared by the request and query histograms
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """
+    What one request spent its time on: SQL statements and named phases
+    (jwt, bcrypt, ...). Shared by reference with the threadpool workers and
+    greenlets that run the request's database work.
+    """
+
+    __slots__ = ("scope", "sql_count", "sql_seconds", "timings")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.timings: dict[str, float] = {}
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Add the time spent in the block to the current request's Server-Timing
+    entry `name`. A no-op outside a request.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[name] = stats.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+class Metrics:
+    """
+    In-process request and SQL metrics, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.requests: dict[tuple, int] = {}
+        self.latency: dict[tuple, Histogram] = {}
+        self.sql_count: dict[tuple, int] = {}
+        self.sql_seconds: dict[tuple, float] = {}
+        self.queries = Histogram()
+        self.slow_queries = 0
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram()).observe(seconds)
+            self.sql_count[key] = self.sql_count.get(key, 0) + stats.sql_count
+            self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + stats.sql_seconds
+
+    def observe_query(self, seconds: float, slow: bool) -> None:
+        with self._lock:
+            self.queries.observe(seconds)
+            self.slow_queries += slow
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """
+        Register a callable returning extra exposition lines (e.g. cache gauges)
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (method, route), histogram in sorted(self.latency.items()):
+                lines.extend(_histogram_lines("http_request_duration_seconds", histogram, method=method, route=route))
+
+            lines.append("# TYPE http_request_db_statements_total counter")
+            for (method, route), count in sorted(self.sql_count.items()):
+                lines.append(f"http_request_db_statements_total{{{_labels(method=method, route=route)}}} {count}")
+
+            lines.append("# TYPE http_request_db_seconds_total counter")
+            for (method, route), seconds in sorted(self.sql_seconds.items()):
+                lines.append(f"http_request_db_seconds_total{{{_labels(method=method, route=route)}}} {seconds:.6f}")
+
+            lines.append("# TYPE db_query_duration_seconds histogram")
+            lines.extend(_histogram_lines("db_query_duration_seconds", self.queries))
+            lines.append("# TYPE db_slow_queries_total counter")
+            lines.append(f"db_slow_queries_total {self.slow_queries}")
+
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}")
+    suffix = f"{{{_labels(**labels)}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.total:.6f}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
+
+
+metrics = Metrics()
+
+
+# ----------------------------
+# SQL instrumentation
+# ----------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+
+    slow = SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS
+    if slow:
+        slow_query_logger.warning(
+            "slow query (%.1f ms) on %s: %s",
+            elapsed * 1000, _route_path(stats.scope) if stats else "-", " ".join(statement.split())[:500]
+        )
+    metrics.observe_query(elapsed, slow)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for a failed statement
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine) -> None:
+    """
+    Count and time every statement run on `engine` (a sync Engine; pass
+    `async_engine.sync_engine` for an AsyncEngine)
+    """
+    if not METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# ----------------------------
+# Middleware
+# ----------------------------
+class MetricsMiddleware:
+    """
+    Times each HTTP request, records it under its route template and adds a
+    Server-Timing header (total, db and any `timed` phases) to the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - start).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            metrics.observe_request(scope["method"], _route_path(scope), status, time.perf_counter() - start, stats)
+
+
+def _route_path(scope: dict) -> str:
+    # The route template (e.g. /products/{product_id}) keeps label cardinality bounded
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    entries = [f"total;dur={total * 1000:.2f}", f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.sql_count} queries"']
+    entries.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in stats.timings.items())
+    return ", ".join(entries)
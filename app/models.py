@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Index, Text, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .database import Base
@@ -16,12 +16,21 @@ class User(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    # Ids are never reused: rollups and holds keyed on a deleted product's id
+    # must not carry over to a new product
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    price = Column(Float, nullable=False)
-    stock = Column(Integer, default=0)
+    price = Column(Float, nullable=False, index=True)
+    stock = Column(Integer, default=0, index=True)
+    # Bumped by every write to the row; ETags of product responses are built from it
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    # Full-text search lives in the products_fts FTS5 table, created and kept
+    # in sync by triggers in migration b81f3d6c0e27 (recreated in a9c3e5f7b140)
 
     cart_items = relationship("CartItem", back_populates="product")
     order_items = relationship("OrderItem", back_populates="product")
@@ -29,10 +38,14 @@ class Product(Base):
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # One line per product per user; add_to_cart upserts against it
+        Index("uq_cart_items_user_product", "user_id", "product_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
     quantity = Column(Integer, nullable=False)
 
     user = relationship("User", back_populates="cart_items")
@@ -41,6 +54,10 @@ class CartItem(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Order history: filter by user, keyset on (created_at, id)
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -55,10 +72,97 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
-    product_id = Column(Integer, ForeignKey("products.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
 
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
+
+
+class IdempotencyRecord(Base):
+    """
+    Stored response of a request sent with an Idempotency-Key (see app/idempotency.py)
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class OrderEvent(Base):
+    """
+    Outbox row written in the checkout transaction and drained by the
+    background worker in app/outbox.py. Rows are deleted once handled.
+    """
+    __tablename__ = "order_events"
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    order_id = Column(Integer, nullable=False)  # no FK: the row is transient
+    payload = Column(Text, nullable=False)  # JSON
+    attempts = Column(Integer, nullable=False, default=0)
+    # Next time the worker may pick the row up; NULL once retries are exhausted
+    available_at = Column(DateTime(timezone=True), index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_error = Column(Text)
+
+
+class StockReservation(Base):
+    """
+    Units of a product held for a user's cart (see app/inventory.py). The
+    units are already taken out of products.stock while the row exists.
+    """
+    __tablename__ = "stock_reservations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    product_id = Column(Integer, primary_key=True, index=True)  # no FK: _delete_product drops the product's holds
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class RevokedToken(Base):
+    """
+    Access token revoked before it expired (see app/revocation.py). Kept
+    until expires_at, after which the token is rejected anyway.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# ----------------------------
+# Sales rollups, kept up to date by checkout (see app/analytics.py)
+# ----------------------------
+class DailyRevenue(Base):
+    __tablename__ = "daily_revenue"
+
+    day = Column(Date, primary_key=True)  # UTC date of the order
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+class ProductSales(Base):
+    __tablename__ = "product_sales"
+    __table_args__ = (
+        # Top-N products walk one of these backwards and stop after N rows
+        Index("ix_product_sales_units", "units", "product_id"),
+        Index("ix_product_sales_revenue", "revenue", "product_id"),
+    )
+
+    # No foreign key: sales history outlives deleted products (whose ids
+    # products.id AUTOINCREMENT never hands out again)
+    product_id = Column(Integer, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
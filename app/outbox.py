@@ -0,0 +1,304 @@
+"""
+Order-events outbox.
+
+Checkout calls enqueue() inside its own transaction, so an event exists if
+and only if its order does. OutboxWorker, started with the app, drains the
+table in the background: each event's handlers run together with the
+deletion of the event row, so work done through the session is applied
+exactly once. Anything else a handler does (e-mail, webhooks) is at least
+once and should tolerate repeats.
+
+The worker's writes (claim, delete, retry) go through run_write(), so in
+DB_WRITE_MODE=serialized they are group-committed like any route's. Each
+poll first checks for due events with a plain SELECT and only claims (an
+UPDATE, which takes the SQLite write lock) when there is one.
+
+Handlers are registered per event type:
+
+    @on("order.placed")
+    def reconcile_stock(db: Session, event: OutboxEvent) -> None:
+        ...
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from .config import (
+    DB_ASYNC, OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL_SECONDS, OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BACKOFF_BASE_SECONDS, OUTBOX_BACKOFF_MAX_SECONDS,
+)
+from .database import AsyncSessionLocal, SessionLocal, run_db
+from .models import OrderEvent
+from .utils.pagination import as_aware_utc
+from .utils.serialization import dumps
+from .write_queue import run_write
+
+logger = logging.getLogger("app.outbox")
+
+ORDER_PLACED = "order.placed"
+
+
+class OutboxEvent(NamedTuple):
+    id: int
+    event_type: str
+    order_id: int
+    payload: dict
+    attempts: int  # including this one
+
+
+Handler = Callable[[Session, OutboxEvent], None]
+handlers: dict[str, list[Handler]] = {}
+
+
+def on(event_type: str):
+    """
+    Register a handler for event_type. Handlers run in the worker, in the
+    transaction that deletes the event; raising makes the event retry.
+    """
+    def register(handler: Handler) -> Handler:
+        handlers.setdefault(event_type, []).append(handler)
+        return handler
+    return register
+
+
+def enqueue(db: Session, event_type: str, order_id: int, payload: dict) -> None:
+    """
+    Add an event to the outbox. Does not commit; call notify() after the commit.
+    """
+    now = datetime.now(timezone.utc)
+    db.add(OrderEvent(
+        event_type=event_type,
+        order_id=order_id,
+        payload=dumps(payload).decode("utf-8"),
+        available_at=now,
+        created_at=now,
+    ))
+
+
+def notify() -> None:
+    """
+    Wake the worker after committing new events instead of waiting for its
+    next poll. Safe to call from any thread.
+    """
+    worker.wake()
+
+
+# ----------------------------
+# Units of work run by the worker
+# ----------------------------
+def _has_due(db: Session) -> bool:
+    due = db.execute(
+        select(OrderEvent.id).where(OrderEvent.available_at <= datetime.now(timezone.utc)).limit(1)
+    ).first()
+    db.rollback()  # end the read transaction before anything on this session writes
+    return due is not None
+
+
+def _claim(db: Session, limit: int) -> list[OutboxEvent]:
+    # Leasing the batch keeps other workers off it; a worker that dies
+    # mid-batch leaves its events to be picked up when the lease runs out
+    now = datetime.now(timezone.utc)
+    due = (
+        select(OrderEvent.id)
+        .where(OrderEvent.available_at <= now)
+        .order_by(OrderEvent.available_at, OrderEvent.id)
+        .limit(limit)
+    )
+    rows = db.execute(
+        update(OrderEvent)
+        .where(OrderEvent.id.in_(due.scalar_subquery()))
+        .values(available_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS), attempts=OrderEvent.attempts + 1)
+        .returning(OrderEvent.id, OrderEvent.event_type, OrderEvent.order_id, OrderEvent.payload, OrderEvent.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return sorted(
+        (OutboxEvent(row.id, row.event_type, row.order_id, json.loads(row.payload), row.attempts) for row in rows),
+        key=lambda e: e.id
+    )
+
+
+def _handle(db: Session, event: OutboxEvent) -> None:
+    try:
+        for handler in handlers.get(event.event_type, ()):
+            handler(db, event)
+        db.execute(delete(OrderEvent).where(OrderEvent.id == event.id))
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+
+def _retry_later(db: Session, event: OutboxEvent, error: str) -> Optional[float]:
+    """
+    Reschedule a failed event with exponential backoff; returns the delay,
+    or None when the event has used up its attempts and is parked.
+    """
+    delay = None
+    available_at = None
+    if event.attempts < OUTBOX_MAX_ATTEMPTS:
+        delay = min(OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (event.attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+        available_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    db.execute(
+        update(OrderEvent)
+        .where(OrderEvent.id == event.id)
+        .values(available_at=available_at, last_error=error)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return delay
+
+
+def _release(db: Session, ids: list[int]) -> None:
+    # Hand back claimed but unprocessed events on shutdown; the attempt is not counted
+    db.execute(
+        update(OrderEvent)
+        .where(OrderEvent.id.in_(ids))
+        .values(available_at=datetime.now(timezone.utc), attempts=OrderEvent.attempts - 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _queue_stats(db: Session) -> tuple[int, int, Optional[datetime]]:
+    pending, oldest = db.execute(
+        select(func.count(), func.min(OrderEvent.created_at)).where(OrderEvent.available_at.is_not(None))
+    ).one()
+    dead = db.execute(select(func.count()).where(OrderEvent.available_at.is_(None))).scalar_one()
+    return pending, dead, oldest
+
+
+# ----------------------------
+# Worker
+# ----------------------------
+class OutboxWorker:
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE, poll_interval: float = OUTBOX_POLL_INTERVAL_SECONDS):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        # Exposed through metrics()
+        self.processed = 0
+        self.failures = 0
+        self.dead = 0
+        self.pending = 0
+        self.oldest_pending: Optional[datetime] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run(), name="outbox-worker")
+
+    async def stop(self) -> None:
+        """
+        Finish the event in progress, release the rest of the batch and exit
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self.wake()
+        try:
+            await self._task
+        finally:
+            self._task = None
+            self._loop = None
+
+    def wake(self) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                claimed = await self.drain_once()
+            except Exception:
+                logger.exception("outbox worker cycle failed")
+                claimed = 0
+            if claimed < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """
+        Claim and handle one batch; returns how many events were claimed
+        """
+        db = _session()
+        try:
+            batch = []
+            if await run_db(db, _has_due):
+                batch = await run_write(db, _claim, self.batch_size)
+            for i, event in enumerate(batch):
+                if self._stopping:
+                    await run_write(db, _release, [e.id for e in batch[i:]])
+                    break
+                try:
+                    await run_write(db, _handle, event)
+                    self.processed += 1
+                except Exception as e:
+                    self.failures += 1
+                    delay = await run_write(db, _retry_later, event, f"{type(e).__name__}: {e}")
+                    if delay is None:
+                        logger.error("outbox event %s (%s) failed %d times, giving up",
+                                     event.id, event.event_type, event.attempts, exc_info=True)
+                    else:
+                        logger.warning("outbox event %s (%s) failed, retrying in %.1fs",
+                                       event.id, event.event_type, delay, exc_info=True)
+            self.pending, self.dead, self.oldest_pending = await run_db(db, _queue_stats)
+            return len(batch)
+        finally:
+            await _close(db)
+
+    def metrics(self):
+        # Prometheus collector; queue depth is as of the worker's last cycle
+        age = 0.0
+        if self.oldest_pending is not None:
+            age = max(0.0, (datetime.now(timezone.utc) - as_aware_utc(self.oldest_pending)).total_seconds())
+        yield "# TYPE outbox_pending_events gauge"
+        yield f"outbox_pending_events {self.pending}"
+        yield "# TYPE outbox_dead_events gauge"
+        yield f"outbox_dead_events {self.dead}"
+        yield "# TYPE outbox_oldest_pending_age_seconds gauge"
+        yield f"outbox_oldest_pending_age_seconds {age:.3f}"
+        yield "# TYPE outbox_events_processed_total counter"
+        yield f"outbox_events_processed_total {self.processed}"
+        yield "# TYPE outbox_event_failures_total counter"
+        yield f"outbox_event_failures_total {self.failures}"
+
+
+def _session():
+    return AsyncSessionLocal() if DB_ASYNC else SessionLocal()
+
+
+async def _close(db) -> None:
+    if DB_ASYNC:
+        await db.close()
+    else:
+        db.close()
+
+
+worker = OutboxWorker()
+
+
+# ----------------------------
+# Built-in consumers
+# ----------------------------
+@on(ORDER_PLACED)
+def _log_order_placed(db: Session, event: OutboxEvent) -> None:
+    # Placeholder notification; real consumers register their own handlers
+    logger.info("order %s placed: %d line(s), total %.2f",
+                event.order_id, len(event.payload["items"]), event.payload["total_amount"])
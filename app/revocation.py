@@ -0,0 +1,169 @@
+"""
+Access-token revocation (POST /auth/logout, force_revoke()).
+
+Every token carries a jti claim. Revoked jtis are stored in revoked_tokens
+until the token would have expired anyway, and mirrored in an in-memory
+map (jti -> exp) that get_current_user checks, so revocation costs a dict
+lookup and no query on the authenticated path. The map is loaded when the
+app starts and refreshed every REVOCATION_REFRESH_SECONDS from the table,
+which is how a revocation made by another process (or force_revoke() from
+a shell) reaches this one. Entries are dropped once their token expires.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .config import DB_ASYNC, REVOCATION_REFRESH_SECONDS, REVOCATION_PURGE_INTERVAL_SECONDS
+from .database import AsyncReadSessionLocal, ReadSessionLocal, SessionLocal, run_db
+from .models import RevokedToken
+from .utils.pagination import as_aware_utc
+
+logger = logging.getLogger("app.revocation")
+
+# A revocation committed by a slow transaction can carry a revoked_at a
+# little older than rows another refresh already saw; re-read that far back
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class Denylist:
+    def __init__(self, refresh_interval: float = REVOCATION_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._expiry: dict[str, float] = {}  # jti -> exp (epoch seconds)
+        self._lock = threading.Lock()
+        self._seen_until: Optional[datetime] = None  # newest revoked_at loaded so far
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, jti: Optional[str]) -> bool:
+        return jti in self._expiry
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def add(self, jti: str, exp: float) -> None:
+        with self._lock:
+            self._expiry[jti] = exp
+
+    def prune(self) -> int:
+        """
+        Forget tokens that have expired; they are rejected on exp alone
+        """
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, exp in self._expiry.items() if exp <= now]
+            for jti in expired:
+                del self._expiry[jti]
+        return len(expired)
+
+    # ----------------------------
+    # Loading
+    # ----------------------------
+    def load(self, db: Session) -> int:
+        """
+        Add revocations stored since the last load (all live ones the first
+        time); returns how many rows were read
+        """
+        stmt = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > datetime.now(timezone.utc)
+        )
+        if self._seen_until is not None:
+            stmt = stmt.where(RevokedToken.revoked_at >= self._seen_until - REFRESH_OVERLAP)
+        rows = db.execute(stmt).all()
+        for jti, expires_at, revoked_at in rows:
+            self.add(jti, as_aware_utc(expires_at).timestamp())
+            revoked_at = as_aware_utc(revoked_at)
+            if self._seen_until is None or revoked_at > self._seen_until:
+                self._seen_until = revoked_at
+        if self._seen_until is None:
+            self._seen_until = datetime.now(timezone.utc)
+        return len(rows)
+
+    async def refresh(self) -> None:
+        db = AsyncReadSessionLocal() if DB_ASYNC else ReadSessionLocal()
+        try:
+            await run_db(db, self.load)
+        finally:
+            if DB_ASYNC:
+                await db.close()
+            else:
+                db.close()
+        self.prune()
+
+    async def start(self) -> None:
+        """
+        Load the stored revocations, then keep refreshing them in the background
+        """
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("could not load revoked tokens")
+        if self.refresh_interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="revocation-refresh")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("refreshing revoked tokens failed")
+
+    def metrics(self):
+        yield "# TYPE revoked_tokens gauge"
+        yield f"revoked_tokens {len(self)}"
+
+
+denylist = Denylist()
+
+
+# ----------------------------
+# Revoking
+# ----------------------------
+_last_purge = 0.0
+
+
+def revoke(db: Session, jti: str, exp: float, user_id: Optional[int] = None) -> None:
+    """
+    Store a revocation in the caller's transaction. After committing, the
+    caller adds it to this process's denylist (other processes pick it up
+    on their next refresh).
+    """
+    global _last_purge
+    now = datetime.now(timezone.utc)
+    if time.monotonic() - _last_purge > REVOCATION_PURGE_INTERVAL_SECONDS:
+        _last_purge = time.monotonic()
+        db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+
+    db.execute(
+        sqlite_insert(RevokedToken)
+        .values(jti=jti, user_id=user_id, expires_at=datetime.fromtimestamp(exp, timezone.utc), revoked_at=now)
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+    )
+
+
+def force_revoke(jti: str, exp: float, user_id: Optional[int] = None) -> None:
+    """
+    Revoke a token by id outside a request, e.g. from a shell on a
+    compromised account. Running apps stop accepting it within
+    REVOCATION_REFRESH_SECONDS.
+    """
+    with SessionLocal() as db:
+        revoke(db, jti, exp, user_id)
+        db.commit()
+    denylist.add(jti, exp)
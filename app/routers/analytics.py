@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import ANALYTICS_DEFAULT_DAYS, ANALYTICS_MAX_DAYS, ANALYTICS_MAX_TOP
+from ..database import get_read_session, run_db
+from ..dependencies import get_current_user
+from ..models import DailyRevenue, Product, ProductSales, User
+from ..schemas import DailyRevenueOut, ProductSalesOut, ProductSalesPage
+from ..utils.pagination import keyset_page
+from ..utils.serialization import FastJSONResponse, row_dicts
+
+# Every query here reads the rollup tables only, never orders/order_items
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+# ----------------------------
+# Revenue by day
+# ----------------------------
+@router.get("/revenue", response_model=list[DailyRevenueOut])
+async def revenue_by_day(
+    start: Optional[date] = Query(None, description=f"First day (UTC); defaults to {ANALYTICS_DEFAULT_DAYS} days before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC), inclusive; defaults to today"),
+    db: Session = Depends(get_read_session),
+    user: User = Depends(get_current_user)
+):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {ANALYTICS_MAX_DAYS} days")
+    return FastJSONResponse(await run_db(db, _revenue_by_day, start, end))
+
+
+def _revenue_by_day(db: Session, start: date, end: date) -> list[dict]:
+    # Days without orders have no row and are omitted
+    stmt = (
+        select(DailyRevenue.day, DailyRevenue.orders, DailyRevenue.units, DailyRevenue.revenue)
+        .where(DailyRevenue.day >= start, DailyRevenue.day <= end)
+        .order_by(DailyRevenue.day)
+    )
+    return row_dicts(db.execute(stmt).mappings())
+
+
+def _product_sales_columns():
+    return select(
+        ProductSales.product_id, Product.name, ProductSales.orders, ProductSales.units, ProductSales.revenue
+    ).outerjoin(Product, Product.id == ProductSales.product_id)
+
+
+# ----------------------------
+# Top products
+# ----------------------------
+@router.get("/top-products", response_model=list[ProductSalesOut])
+async def top_products(
+    by: str = Query("units", pattern="^(units|revenue)$"),
+    limit: int = Query(10, ge=1, le=ANALYTICS_MAX_TOP),
+    db: Session = Depends(get_read_session),
+    user: User = Depends(get_current_user)
+):
+    return FastJSONResponse(await run_db(db, _top_products, by, limit))
+
+
+def _top_products(db: Session, by: str, limit: int) -> list[dict]:
+    # Walks ix_product_sales_units / ix_product_sales_revenue backwards and stops
+    # after `limit` rows; ties go to the newer product so no sort is needed
+    column = ProductSales.units if by == "units" else ProductSales.revenue
+    stmt = _product_sales_columns().order_by(column.desc(), ProductSales.product_id.desc()).limit(limit)
+    return row_dicts(db.execute(stmt).mappings())
+
+
+# ----------------------------
+# Units and revenue per product
+# ----------------------------
+@router.get("/products", response_model=ProductSalesPage)
+async def product_sales(
+    limit: int = Query(ANALYTICS_MAX_TOP, ge=1, le=ANALYTICS_MAX_TOP),
+    after: Optional[int] = Query(None, description="Cursor: return products with an id greater than this"),
+    db: Session = Depends(get_read_session),
+    user: User = Depends(get_current_user)
+):
+    return FastJSONResponse(await run_db(db, _product_sales, limit, after))
+
+
+def _product_sales(db: Session, limit: int, after: Optional[int]) -> dict:
+    stmt = _product_sales_columns().order_by(ProductSales.product_id)
+    if after is not None:
+        stmt = stmt.where(ProductSales.product_id > after)
+
+    rows, next_cursor = keyset_page(
+        row_dicts(db.execute(stmt.limit(limit + 1)).mappings()), limit, lambda row: row["product_id"]
+    )
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+@router.get("/products/{product_id}", response_model=ProductSalesOut)
+async def product_sales_for(
+    product_id: int,
+    db: Session = Depends(get_read_session),
+    user: User = Depends(get_current_user)
+):
+    row = await run_db(db, _product_sales_for, product_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="No sales recorded for this product")
+    return FastJSONResponse(row)
+
+
+def _product_sales_for(db: Session, product_id: int) -> Optional[dict]:
+    row = db.execute(_product_sales_columns().where(ProductSales.product_id == product_id)).mappings().first()
+    return dict(row) if row else None
@@ -1,15 +1,19 @@
+from functools import partial
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
-from ..database import get_db
+from ..database import get_read_session, get_write_session, run_db
+from ..dependencies import get_current_user, oauth2_scheme
 from ..models import User
+from ..revocation import denylist, revoke
 from ..schemas import UserLogin, TokenOut
-from ..utils.security import verify_password
-from ..utils.jwt import create_access_token
+from ..utils.security import verify_password_async
+from ..utils.jwt import create_access_token, decode_access_token
 from ..config import ACCESS_TOKEN_EXPIRE_MINUTES
+from ..write_queue import after_commit, run_write
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -39,7 +43,7 @@ async def get_login_credentials(request: Request):
 async def login_user(
         body: Optional[UserLogin] = None,
         credentials: dict = Depends(get_login_credentials),  # Use only this
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_session)
 ):
     email = credentials.get("username") or body.email
     password = credentials.get("password") or body.password
@@ -48,15 +52,8 @@ async def login_user(
         # Explicitly return 422 if fields are missing to help debugging
         raise HTTPException(status_code=422, detail="Missing email or password")
 
-    db_user = db.query(User).filter(User.email == email).first()
-    if not db_user or not verify_password(password, db_user.hashed_password):
-        raise HTTPException(status_code=401, detail="Invalid email or password")
-
-    if not email or not password:
-        raise HTTPException(status_code=422, detail="Missing email or password")
-
-    db_user = db.query(User).filter(User.email == email).first()
-    if not db_user or not verify_password(password, db_user.hashed_password):
+    db_user = await run_db(db, _find_user_by_email, email)
+    if not db_user or not await verify_password_async(password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -65,3 +62,31 @@ async def login_user(
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+def _find_user_by_email(db: Session, email: str) -> Optional[User]:
+    db_user = db.query(User).filter(User.email == email).first()
+    # Hand the connection back to the pool before waiting on bcrypt
+    db.close()
+    return db_user
+
+
+@router.post("/logout")
+async def logout_user(
+        token: str = Depends(oauth2_scheme),
+        db: Session = Depends(get_write_session),
+        user: User = Depends(get_current_user)
+):
+    # Revokes this token only; the user's other sessions stay logged in
+    payload = decode_access_token(token)
+    if not payload.get("jti"):
+        # Issued before tokens carried an id; it simply runs out at its exp
+        raise HTTPException(status_code=400, detail="Token cannot be revoked")
+    await run_write(db, _revoke_token, payload["jti"], payload["exp"], user.id)
+    return {"message": "Logged out successfully"}
+
+
+def _revoke_token(db: Session, jti: str, exp: float, user_id: int) -> None:
+    revoke(db, jti, exp, user_id)
+    db.commit()
+    after_commit(db, partial(denylist.add, jti, exp))
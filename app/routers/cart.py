@@ -1,96 +1,275 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from functools import partial
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import case, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..database import get_db
-from ..models import CartItem, Order, OrderItem, User
-from ..schemas import CartAdd, CartItemOut, OrderOut
+from ..analytics import record_order
+from ..catalog_cache import catalog_cache
+from ..database import get_read_session, get_write_session, run_db
+from ..models import CartItem, Order, OrderItem, Product, User
+from ..schemas import CartAdd, CartBatch, CartItemOut, OrderOut
 from ..dependencies import get_current_user
+from ..idempotency import IdempotencyRequest, idempotent, lookup, save
+from .. import inventory, outbox
+from ..utils.serialization import FastJSONResponse
+from ..write_queue import after_commit, run_write
 
 router = APIRouter(prefix="/cart", tags=["Cart"])
 
+def _cart_upsert(replace: bool = False):
+    """
+    INSERT ... ON CONFLICT for cart lines: adds to (or with replace, sets) the
+    quantity of an existing (user_id, product_id) line instead of adding a row
+    """
+    stmt = sqlite_insert(CartItem)
+    quantity = stmt.excluded.quantity if replace else CartItem.quantity + stmt.excluded.quantity
+    return stmt.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.product_id],
+        set_={"quantity": quantity}
+    )
+
+
+def _cart_line_rows(db: Session, user_id: int, product_ids=None) -> list[dict]:
+    # Cart lines joined with current prices in a single query, as plain CartItemOut-shaped dicts
+    query = (
+        db.query(CartItem.product_id, CartItem.quantity, Product.price)
+        .join(Product, Product.id == CartItem.product_id)
+        .filter(CartItem.user_id == user_id)
+        .order_by(CartItem.id)
+    )
+    if product_ids is not None:
+        query = query.filter(CartItem.product_id.in_(product_ids))
+    return [
+        {
+            "product_id": product_id,
+            "quantity": quantity,
+            "price_per_unit": price,
+            "total_price": price * quantity
+        } for product_id, quantity, price in query
+    ]
+
+
+def _cart_lines(db: Session, user_id: int, product_ids=None) -> list[CartItemOut]:
+    return [CartItemOut(**row) for row in _cart_line_rows(db, user_id, product_ids)]
+
+
+async def _release_expired_holds(db: Session) -> None:
+    # Expired holds go back to stock in their own unit before the request
+    # takes any: a 409 rolls back the whole unit it happens in
+    if inventory.sweep_due():
+        await run_write(db, _release_expired)
+
+
+def _release_expired(db: Session) -> None:
+    stock_changed = inventory.release_expired(db)
+    db.commit()
+    after_commit(db, partial(catalog_cache.invalidate, stock_changed))
+
+
 # Add item to cart
 @router.post("/", response_model=CartItemOut)
-def add_to_cart(item: CartAdd, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    cart_item = CartItem(user_id=user.id, product_id=item.product_id, quantity=item.quantity)
-    db.add(cart_item)
+async def add_to_cart(
+    item: CartAdd,
+    request: Request,
+    db: Session = Depends(get_write_session),
+    user: User = Depends(get_current_user)
+):
+    await _release_expired_holds(db)
+    return await idempotent(request, user.id, lambda idem: run_write(db, _add_to_cart, user.id, item, idem))
+
+
+def _add_to_cart(db: Session, user_id: int, item: CartAdd, idem: Optional[IdempotencyRequest] = None):
+    if idem is not None and (stored := lookup(db, idem)) is not None:
+        return stored
+
+    product = catalog_cache.get_product(db, item.product_id, route="add_to_cart")
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    price = product.price
+
+    quantity = db.execute(
+        _cart_upsert()
+        .values(user_id=user_id, product_id=item.product_id, quantity=item.quantity)
+        .returning(CartItem.quantity)
+    ).scalar_one()
+    # Hold the units for this cart; 409 (and nothing saved) when they are not in stock.
+    # A line left non-positive by older versions holds nothing.
+    stock_changed = inventory.hold(db, user_id, {item.product_id: max(quantity, 0)})
+    result = CartItemOut(
+        product_id=item.product_id,
+        quantity=quantity,
+        price_per_unit=price,
+        total_price=price * quantity
+    )
+    if idem is not None and (stored := save(db, idem, result)) is not None:
+        return stored
     db.commit()
-    db.refresh(cart_item)
-    return CartItemOut(
-        product_id=cart_item.product_id,
-        quantity=cart_item.quantity,
-        price_per_unit=cart_item.product.price,
-        total_price=cart_item.product.price * cart_item.quantity
+    after_commit(db, partial(catalog_cache.invalidate, stock_changed))
+    return result
+
+# Add or update many cart lines at once
+@router.post("/batch", response_model=list[CartItemOut])
+async def add_many_to_cart(batch: CartBatch, db: Session = Depends(get_write_session), user: User = Depends(get_current_user)):
+    await _release_expired_holds(db)
+    return await run_write(db, _add_many_to_cart, user.id, batch)
+
+
+def _add_many_to_cart(db: Session, user_id: int, batch: CartBatch) -> list[CartItemOut]:
+    quantities: dict[int, int] = {}
+    for item in batch.items:
+        if batch.replace:
+            quantities[item.product_id] = item.quantity
+        else:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    if not quantities:
+        return []
+
+    found = catalog_cache.get_products(db, quantities, route="add_many_to_cart")
+    missing = sorted(set(quantities) - set(found))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Products not found: {missing}")
+
+    # Replacing a quantity with 0 removes the line (and releases its hold)
+    removed = [pid for pid, qty in quantities.items() if qty == 0]
+    if removed:
+        db.query(CartItem).filter(
+            CartItem.user_id == user_id, CartItem.product_id.in_(removed)
+        ).delete(synchronize_session=False)
+    upserts = [{"user_id": user_id, "product_id": pid, "quantity": qty} for pid, qty in quantities.items() if qty > 0]
+    if upserts:
+        db.execute(_cart_upsert(replace=batch.replace), upserts)
+    lines = _cart_lines(db, user_id, product_ids=list(quantities))
+    stock_changed = inventory.hold(
+        db, user_id, {**{pid: 0 for pid in removed}, **{line.product_id: max(line.quantity, 0) for line in lines}}
     )
+    db.commit()
+    after_commit(db, partial(catalog_cache.invalidate, stock_changed))
+    return lines
 
 # View cart
 @router.get("/", response_model=list[CartItemOut])
-def view_cart(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    items = db.query(CartItem).filter(CartItem.user_id == user.id).all()
-    return [
-        CartItemOut(
-            product_id=i.product_id,
-            quantity=i.quantity,
-            price_per_unit=i.product.price,
-            total_price=i.product.price * i.quantity
-        ) for i in items
-    ]
+async def view_cart(db: Session = Depends(get_read_session), user: User = Depends(get_current_user)):
+    return FastJSONResponse(await run_db(db, _cart_line_rows, user.id))
 
 @router.post("/checkout", response_model=OrderOut)
-def checkout(
-    db: Session = Depends(get_db),
+async def checkout(
+    request: Request,
+    db: Session = Depends(get_write_session),
     current_user: User = Depends(get_current_user)
 ):
-    # Fetch all cart items for the user
-    cart_items = db.query(CartItem).filter(CartItem.user_id == current_user.id).all()
-    if not cart_items:
+    await _release_expired_holds(db)
+    return await idempotent(request, current_user.id, lambda idem: run_write(db, _checkout, current_user.id, idem))
+
+
+def _checkout(db: Session, user_id: int, idem: Optional[IdempotencyRequest] = None):
+    # A retry of a checkout that already went through gets the same order back
+    if idem is not None and (stored := lookup(db, idem)) is not None:
+        return stored
+
+    # Fetch the user's cart lines, merging repeated lines for the same product.
+    # Lines orphaned by product deletes of older versions (product_id NULL) are
+    # skipped like view_cart skips them, and cleared with the rest of the cart
+    quantities: dict[int, int] = {}
+    cart_rows = db.query(CartItem.product_id, CartItem.quantity).filter(
+        CartItem.user_id == user_id, CartItem.product_id.is_not(None)
+    )
+    for product_id, quantity in cart_rows:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
         raise HTTPException(status_code=400, detail="Cart is empty")
+    # The conditional stock UPDATE below is only a guard for positive quantities
+    invalid = sorted(product_id for product_id, quantity in quantities.items() if quantity <= 0)
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid cart quantities for products: {invalid}")
 
-    # Calculate total amount
-    total_amount = sum(item.product.price * item.quantity for item in cart_items)
+    # Prices come from the catalog cache; misses are fetched in a single IN query
+    products = catalog_cache.get_products(db, quantities, route="checkout")
+    prices = {product_id: product.price for product_id, product in products.items()}
+    missing = sorted(set(quantities) - set(prices))
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Products no longer available: {missing}")
 
+    total_amount = sum(prices[product_id] * quantity for product_id, quantity in quantities.items())
+
+    order_time = datetime.now(timezone.utc)
     try:
-        # Start transaction: create Order
-        order = Order(user_id=current_user.id, total_amount=total_amount)
+        # Held units were taken from stock when they went into the cart; only
+        # what no hold covers (expired, or carts older than holds) is taken now
+        unheld, stock_changed = inventory.consume(db, user_id, quantities)
+        if unheld:
+            # Check and decrement stock for those lines in one conditional UPDATE;
+            # a line without enough stock is skipped, which shows up in the row count
+            needed = case(unheld, value=Product.id)
+            result = db.execute(
+                update(Product)
+                .where(Product.id.in_(unheld), Product.stock >= needed)
+                .values(stock=Product.stock - needed, version=Product.version + 1, updated_at=order_time)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(unheld):
+                db.rollback()
+                raise HTTPException(status_code=409, detail="Insufficient stock")
+
+        order = Order(user_id=user_id, total_amount=total_amount, created_at=order_time)
         db.add(order)
         db.flush()  # get order.id without committing
 
-        order_items_out = []
-        # Create OrderItems
-        for item in cart_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                price=item.product.price
-            )
-            db.add(order_item)
+        # Insert all OrderItems in one batch
+        order_items = [
+            {"order_id": order.id, "product_id": product_id, "quantity": quantity, "price": prices[product_id]}
+            for product_id, quantity in quantities.items()
+        ]
+        db.execute(insert(OrderItem), order_items)
 
-            order_items_out.append(
-                CartItemOut(
-                    product_id=order_item.product_id,
-                    quantity=order_item.quantity,
-                    price_per_unit=order_item.price,
-                    total_price=order_item.price * order_item.quantity
-                )
-            )
+        # Sales rollups move in the same transaction as the order
+        record_order(
+            db, order.created_at.date(), total_amount,
+            {product_id: (quantity, prices[product_id]) for product_id, quantity in quantities.items()}
+        )
 
-        # Clear user's cart
-        db.query(CartItem).filter(CartItem.user_id == current_user.id).delete(synchronize_session=False)
+        # Follow-up work (notifications, reconciliation, ...) runs in the outbox
+        # worker; only the event row is written here
+        outbox.enqueue(db, outbox.ORDER_PLACED, order.id, {
+            "order_id": order.id,
+            "user_id": user_id,
+            "total_amount": total_amount,
+            "created_at": order.created_at,
+            "items": [
+                {"product_id": oi["product_id"], "quantity": oi["quantity"], "price": oi["price"]}
+                for oi in order_items
+            ],
+        })
 
-        # Commit everything
-        db.commit()
-        db.refresh(order)
+        # Clear user's cart
+        db.query(CartItem).filter(CartItem.user_id == user_id).delete(synchronize_session=False)
 
-        return OrderOut(
+        order_out = OrderOut(
             id=order.id,
             total_amount=total_amount,
-            items=order_items_out
+            created_at=order.created_at,
+            items=[
+                CartItemOut(
+                    product_id=oi["product_id"],
+                    quantity=oi["quantity"],
+                    price_per_unit=oi["price"],
+                    total_price=oi["price"] * oi["quantity"]
+                ) for oi in order_items
+            ]
         )
+        # Stored with the order, so a key never exists without its order (or vice versa)
+        if idem is not None and (stored := save(db, idem, order_out)) is not None:
+            return stored
+
+        db.commit()
+        after_commit(db, partial(catalog_cache.invalidate, [*unheld, *stock_changed]))  # stock changed
+        after_commit(db, outbox.notify)
+        return order_out
 
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Checkout failed: {str(e)}")
-    except Exception as e:
-        db.rollback()
-
@@ -1,25 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException
+import re
+from datetime import datetime, timezone
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List
+from typing import Optional
 
-from ..database import get_db
-from ..models import Product, User
-from ..schemas import ProductCreate, ProductOut
+from ..config import (
+    PRODUCTS_PAGE_SIZE, PRODUCTS_MAX_PAGE_SIZE, PRODUCTS_STREAM_CHUNK_SIZE, DB_ASYNC,
+    SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE, BULK_BATCH_SIZE, BULK_MAX_ERRORS,
+)
+from ..database import get_read_session, get_write_session, run_db, ReadSessionLocal, AsyncReadSessionLocal
+from ..catalog_cache import catalog_cache
+from ..models import CartItem, Product, StockReservation, User
+from ..schemas import CatalogProduct, ProductCreate, ProductOut, ProductPage, ProductSearchPage, BulkImportReport, BulkRowError
 from ..dependencies import get_current_user
+from ..utils.bulk import iter_csv_rows, iter_ndjson_rows, csv_lines
+from ..utils.conditional import conditional_response, make_etag, precondition_failed
+from ..utils.serialization import FastJSONResponse, dumps
+from ..utils.pagination import encode_rank_cursor, decode_rank_cursor, keyset_page
+from ..write_queue import after_commit, run_write
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
+# Each route delegates its database work to a plain function taking a Session,
+# run through run_db so it works on both the sync and the async DB path.
+# Read-only routes take get_read_session, routes that write get_write_session.
+
 # ----------------------------
 # Create a product
 # ----------------------------
 @router.post("/", response_model=ProductOut)
-def create_product(
+async def create_product(
     product: ProductCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_session),
     user: User = Depends(get_current_user)
 ):
     # You may add admin check here if needed
+    return await run_write(db, _create_product, product)
+
+
+def _create_product(db: Session, product: ProductCreate) -> ProductOut:
     db_product = Product(
         name=product.name,
         description=product.description,
@@ -29,31 +55,293 @@ def create_product(
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
-    return db_product
+    after_commit(db, partial(catalog_cache.invalidate, [db_product.id], membership_changed=True))
+    return ProductOut.model_validate(db_product)
+
+
+# ----------------------------
+# List products (keyset pagination on id)
+# ----------------------------
+@router.get("/", response_model=ProductPage)
+async def list_products(
+    request: Request,
+    limit: int = Query(PRODUCTS_PAGE_SIZE, ge=1, le=PRODUCTS_MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Cursor: return products with an id greater than this"),
+    stream: bool = Query(False, description="Stream every product after the cursor as NDJSON"),
+    db: Session = Depends(get_read_session),
+    user: User = Depends(get_current_user)
+):
+    if stream:
+        rows = _stream_products_async(after) if DB_ASYNC else _stream_products(after)
+        return StreamingResponse(rows, media_type="application/x-ndjson")
+    page = await run_db(db, _list_products, limit, after)
+    # No Last-Modified: deleting a product changes the page without making it newer
+    etag = make_etag([page.next_cursor, *(f"{p.id}.{p.version}" for p in page.items)])
+    return conditional_response(request, page, etag)
+
+
+def _list_products(db: Session, limit: int, after: Optional[int]) -> ProductPage:
+    return catalog_cache.get_page(db, limit, after, route="list_products")
+
+
+def _product_rows(after: Optional[int]):
+    stmt = select(
+        Product.id, Product.name, Product.description, Product.price, Product.stock
+    ).order_by(Product.id)
+    if after is not None:
+        stmt = stmt.where(Product.id > after)
+    return stmt.execution_options(stream_results=True, yield_per=PRODUCTS_STREAM_CHUNK_SIZE)
+
+
+PRODUCT_COLUMNS = ("id", "name", "description", "price", "stock")
+
+
+def _ndjson(chunk) -> bytes:
+    return b"".join(dumps(dict(row)) + b"\n" for row in chunk)
+
+
+def _csv(chunk) -> str:
+    return csv_lines([row[c] for c in PRODUCT_COLUMNS] for row in chunk)
+
+
+def _stream_products(after: Optional[int], render=_ndjson, header: str = ""):
+    """
+    Yield rendered products, one chunk of rows at a time.
+    Uses its own session because the body is sent after the request-scoped one is released.
+    """
+    if header:
+        yield header
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(_product_rows(after))
+        for chunk in result.mappings().partitions(PRODUCTS_STREAM_CHUNK_SIZE):
+            yield render(chunk)
+    finally:
+        db.close()
+
+
+async def _stream_products_async(after: Optional[int], render=_ndjson, header: str = ""):
+    """
+    Async variant of _stream_products for the async DB path.
+    """
+    if header:
+        yield header
+    db = AsyncReadSessionLocal()
+    try:
+        result = await db.stream(_product_rows(after))
+        async for chunk in result.mappings().partitions(PRODUCTS_STREAM_CHUNK_SIZE):
+            yield render(chunk)
+    finally:
+        await db.close()
+
+
+# ----------------------------
+# Bulk import (CSV or NDJSON, streamed)
+# ----------------------------
+@router.post("/bulk", response_model=BulkImportReport)
+async def bulk_import_products(
+    request: Request,
+    db: Session = Depends(get_write_session),
+    user: User = Depends(get_current_user)
+):
+    content_type = request.headers.get("Content-Type", "")
+    if "csv" in content_type:
+        rows = iter_csv_rows(request.stream())
+    elif "ndjson" in content_type or "jsonl" in content_type:
+        rows = iter_ndjson_rows(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Unsupported Media Type")
+
+    report = BulkImportReport(inserted=0, updated=0, failed=0, errors=[])
+
+    def fail(row: int, error: str):
+        report.failed += 1
+        if len(report.errors) < BULK_MAX_ERRORS:
+            report.errors.append(BulkRowError(row=row, error=error))
+
+    async def flush(batch):
+        result = await run_write(db, _write_products_batch, batch)
+        if isinstance(result, str):
+            for row, _, _ in batch:
+                fail(row, result)
+            return
+        inserted, updated_ids = result
+        report.inserted += inserted
+        report.updated += len(updated_ids)
+        catalog_cache.invalidate(updated_ids, membership_changed=True)
+
+    batch = []
+    async for row, data, error in rows:
+        if error:
+            fail(row, error)
+            continue
+        try:
+            product_id = data.pop("id", None)
+            product_id = int(product_id) if product_id is not None else None
+            product = ProductCreate.model_validate(data)
+        except ValidationError as e:
+            fail(row, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        except ValueError:
+            fail(row, "id: must be an integer")
+            continue
+
+        batch.append((row, product_id, product.model_dump()))
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    report.errors.sort(key=lambda e: e.row)
+    return report
+
+
+def _write_products_batch(db: Session, batch: list):
+    """
+    Write one batch in a single transaction: rows without an id are inserted,
+    rows with an id are upserted. Returns (inserted count, updated ids), or an
+    error message if the batch was rolled back.
+    """
+    new_rows = [values for _, product_id, values in batch if product_id is None]
+    keyed = {product_id: values for _, product_id, values in batch if product_id is not None}
+
+    try:
+        existing = []
+        if keyed:
+            existing = [pid for (pid,) in db.query(Product.id).filter(Product.id.in_(keyed))]
+        if new_rows:
+            db.execute(insert(Product), new_rows)
+        if keyed:
+            stmt = sqlite_insert(Product)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[Product.id],
+                    set_={
+                        **{c: stmt.excluded[c] for c in ("name", "description", "price", "stock", "updated_at")},
+                        "version": Product.version + 1,
+                    }
+                ),
+                [{"id": product_id, **values} for product_id, values in keyed.items()]
+            )
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        return f"Batch failed: {e.__class__.__name__}"
+
+    return len(new_rows) + len(keyed) - len(existing), existing
 
 
 # ----------------------------
-# List all products
+# Streaming export
 # ----------------------------
-@router.get("/", response_model=List[ProductOut])
-def list_products(
-    db: Session = Depends(get_db),
+@router.get("/export")
+async def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
     user: User = Depends(get_current_user)
 ):
-    products = db.query(Product).all()
-    return products
+    if format == "csv":
+        render, header, media_type = _csv, csv_lines([PRODUCT_COLUMNS]), "text/csv"
+    else:
+        render, header, media_type = _ndjson, "", "application/x-ndjson"
+    stream = _stream_products_async if DB_ASYNC else _stream_products
+    return StreamingResponse(stream(None, render, header), media_type=media_type)
+
+
+# ----------------------------
+# Full-text search
+# ----------------------------
+@router.get("/search", response_model=ProductSearchPage)
+async def search_products(
+    q: str = Query(..., min_length=1, description="Words to match in name or description"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: bool = Query(False, description="Only products with stock > 0"),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    db: Session = Depends(get_read_session),
+    user: User = Depends(get_current_user)
+):
+    match = _fts_query(q)
+    if not match:
+        raise HTTPException(status_code=422, detail="Search query has no searchable words")
+    return FastJSONResponse(await run_db(db, _search_products, match, min_price, max_price, in_stock, limit, after))
+
+
+def _fts_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word must match, the last one as
+    a prefix. Words are quoted so FTS5 operators in user input are inert.
+    """
+    words = re.findall(r"\w+", q)
+    terms = [f'"{word}"' for word in words]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _search_products(
+    db: Session,
+    match: str,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    in_stock: bool,
+    limit: int,
+    after: Optional[str]
+) -> ProductSearchPage:
+    # Ranked by bm25 (lower is better), ties broken by id for stable keyset pages
+    conditions = ["products_fts MATCH :match"]
+    params = {"match": match, "limit": limit + 1}
+    if min_price is not None:
+        conditions.append("p.price >= :min_price")
+        params["min_price"] = min_price
+    if max_price is not None:
+        conditions.append("p.price <= :max_price")
+        params["max_price"] = max_price
+    if in_stock:
+        conditions.append("p.stock > 0")
+    if after is not None:
+        params["after_rank"], params["after_id"] = decode_rank_cursor(after)
+        conditions.append(
+            "(bm25(products_fts) > :after_rank OR (bm25(products_fts) = :after_rank AND p.id > :after_id))"
+        )
+
+    rows = db.execute(text(f"""
+        SELECT p.id, p.name, p.description, p.price, p.stock, bm25(products_fts) AS rank
+        FROM products_fts JOIN products AS p ON p.id = products_fts.rowid
+        WHERE {" AND ".join(conditions)}
+        ORDER BY rank, p.id
+        LIMIT :limit
+    """), params).mappings().all()
+
+    rows, next_cursor = keyset_page(rows, limit, lambda row: encode_rank_cursor(row["rank"], row["id"]))
+    return ProductSearchPage(items=[dict(row) for row in rows], next_cursor=next_cursor)
+
+
+# ----------------------------
+# Catalog cache statistics
+# ----------------------------
+@router.get("/cache-stats")
+async def catalog_cache_stats(user: User = Depends(get_current_user)):
+    return catalog_cache.stats()
 
 
 # ----------------------------
 # Get product by ID
 # ----------------------------
 @router.get("/{product_id}", response_model=ProductOut)
-def get_product(
+async def get_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_session),
     user: User = Depends(get_current_user)
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await run_db(db, _get_product, product_id)
+    return conditional_response(request, product, make_etag([product.id, product.version]), product.updated_at)
+
+
+def _get_product(db: Session, product_id: int) -> CatalogProduct:
+    product = catalog_cache.get_product(db, product_id, route="get_product")
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
@@ -63,44 +351,82 @@ def get_product(
 # Update product
 # ----------------------------
 @router.put("/{product_id}", response_model=ProductOut)
-def update_product(
+async def update_product(
     product_id: int,
     product_data: ProductCreate,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_write_session),
     user: User = Depends(get_current_user)
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    # Optional If-Match: the update only applies to the version the client last saw
+    product, version = await run_write(db, _update_product, product_id, product_data, request.headers.get("if-match"))
+    return FastJSONResponse(product, headers={"ETag": make_etag([product_id, version])})
+
+
+def _update_product(
+    db: Session,
+    product_id: int,
+    product_data: ProductCreate,
+    if_match: Optional[str] = None
+) -> tuple[ProductOut, int]:
+    version = db.scalar(select(Product.version).where(Product.id == product_id))
+    if version is None:
         raise HTTPException(status_code=404, detail="Product not found")
+    if precondition_failed(if_match, make_etag([product_id, version])):
+        raise HTTPException(status_code=412, detail="Product was modified since it was read")
 
-    product.name = product_data.name
-    product.description = product_data.description
-    product.price = product_data.price
-    product.stock = product_data.stock
+    # Compare-and-swap on the version just checked, so a write that lands in
+    # between is reported instead of silently overwritten
+    result = db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.version == version)
+        .values(
+            name=product_data.name,
+            description=product_data.description,
+            price=product_data.price,
+            stock=product_data.stock,
+            version=version + 1,
+            updated_at=datetime.now(timezone.utc)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=412, detail="Product was modified since it was read")
 
+    product = db.get(Product, product_id, populate_existing=True)
     db.commit()
-    db.refresh(product)
-    return product
+    after_commit(db, partial(catalog_cache.invalidate, [product_id]))
+    return ProductOut.model_validate(product), version + 1
 
 
 # ----------------------------
 # Delete product
 # ----------------------------
 @router.delete("/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_session),
     user: User = Depends(get_current_user)
 ):
+    return await run_write(db, _delete_product, product_id)
+
+
+def _delete_product(db: Session, product_id: int) -> dict:
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
     try:
+        # Holds have no FK to the product, so nothing else removes them
+        db.execute(delete(StockReservation).where(StockReservation.product_id == product_id))
+        # Cart lines would otherwise be left pointing at nothing (product_id NULL)
+        db.execute(delete(CartItem).where(CartItem.product_id == product_id))
         db.delete(product)
         db.commit()
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete product: {str(e)}")
+    after_commit(db, partial(catalog_cache.invalidate, [product_id], membership_changed=True))
 
     return {"message": "Product deleted successfully"}
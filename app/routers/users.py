@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select, tuple_
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Optional
 
-from ..database import get_db
+from ..database import get_read_session, get_write_session, run_db
 from ..models import User, Order, OrderItem
-from ..schemas import UserCreate, UserLogin, UserOut, TokenOut, OrderOut, CartItemOut
-from ..utils.security import get_password_hash, verify_password
+from ..config import ORDERS_PAGE_SIZE, ORDERS_MAX_PAGE_SIZE
+from ..schemas import UserCreate, UserLogin, UserOut, TokenOut, OrderPage
+from ..utils.security import get_password_hash_async
 from ..utils.jwt import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from ..dependencies import get_current_user
+from ..utils.conditional import conditional_response, make_etag
+from ..utils.pagination import encode_cursor, decode_cursor, as_aware_utc, as_naive_utc, keyset_page
+from ..write_queue import run_write
+from ..utils.serialization import row_dicts
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -16,13 +23,23 @@ router = APIRouter(prefix="/users", tags=["Users"])
 # Register user
 # --------------------
 @router.post("/register", response_model=UserOut)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
-    if existing_user:
+async def register_user(user: UserCreate, db: Session = Depends(get_write_session)):
+    if await run_db(db, _email_taken, user.email):
         raise HTTPException(status_code=400, detail="User already exists")
+    hashed_password = await get_password_hash_async(user.password)
+    return await run_write(db, _create_user, user.email, hashed_password)
+
+
+def _email_taken(db: Session, email: str) -> bool:
+    existing_user = db.query(User.id).filter(User.email == email).first()
+    # Hand the connection back to the pool before waiting on bcrypt
+    db.close()
+    return existing_user is not None
+
+
+def _create_user(db: Session, email: str, hashed_password: str) -> UserOut:
     try:
-        hashed_password = get_password_hash(user.password)
-        new_user = User(email=user.email, hashed_password=hashed_password)
+        new_user = User(email=email, hashed_password=hashed_password)
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
@@ -34,23 +51,70 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserOut)
-def get_me(user: User = Depends(get_current_user)):
+async def get_me(user: User = Depends(get_current_user)):
     return UserOut(id=user.id, email=user.email)
 
 
-@router.get("/orders", response_model=list[OrderOut])
-def get_my_orders(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    orders = db.query(Order).filter(Order.user_id == current_user.id).all()
-    order_list = []
+@router.get("/orders", response_model=OrderPage)
+async def get_my_orders(
+    request: Request,
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_MAX_PAGE_SIZE),
+    before: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    start: Optional[datetime] = Query(None, description="Only orders created at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only orders created before this time"),
+    db: Session = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    page = await run_db(db, _get_my_orders, current_user.id, limit, before, start, end)
+    # Orders never change once placed, so their ids and timestamps are their version
+    orders = page["items"]
+    etag = make_etag([page["next_cursor"], *(f"{o['id']}.{o['created_at']}" for o in orders)])
+    return conditional_response(request, page, etag, max((o["created_at"] for o in orders), default=None))
+
+
+def _get_my_orders(
+    db: Session,
+    user_id: int,
+    limit: int,
+    before: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> dict:
+    """
+    One OrderPage as plain data. Newest first; orders and the page's items are
+    column projections, the items loaded in one extra IN query.
+    """
+    stmt = (
+        select(Order.id, Order.total_amount, Order.created_at)
+        .where(Order.user_id == user_id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )
+    if start is not None:
+        stmt = stmt.where(Order.created_at >= as_naive_utc(start))
+    if end is not None:
+        stmt = stmt.where(Order.created_at < as_naive_utc(end))
+    if before is not None:
+        created_at, order_id = decode_cursor(before)
+        stmt = stmt.where(tuple_(Order.created_at, Order.id) < (as_naive_utc(created_at), order_id))
+
+    orders = row_dicts(db.execute(stmt.limit(limit + 1)).mappings())
+    for order in orders:
+        order["created_at"] = as_aware_utc(order["created_at"])
+    orders, next_cursor = keyset_page(orders, limit, lambda order: encode_cursor(order["created_at"], order["id"]))
+
+    items_by_order = {}
     for order in orders:
-        items = [
-            CartItemOut(
-                product_id=oi.product_id,
-                quantity=oi.quantity,
-                price_per_unit=oi.price,
-                total_price=oi.price * oi.quantity
-            )
-            for oi in order.items
-        ]
-        order_list.append(OrderOut(id=order.id, total_amount=order.total_amount, items=items))
-    return order_list
+        order["items"] = items_by_order[order["id"]] = []
+    if items_by_order:
+        item_rows = db.execute(
+            select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.price)
+            .where(OrderItem.order_id.in_(items_by_order))
+        )
+        for order_id, product_id, quantity, price in item_rows:
+            items_by_order[order_id].append({
+                "product_id": product_id,
+                "quantity": quantity,
+                "price_per_unit": price,
+                "total_price": price * quantity
+            })
+    return {"items": orders, "next_cursor": next_cursor}
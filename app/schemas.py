@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List
 
+from .utils.pagination import as_aware_utc
+
 # User schemas
 class UserCreate(BaseModel):
     email: str
@@ -39,13 +42,55 @@ class ProductOut(BaseModel):
 
     model_config = {"from_attributes": True}
 
+class CatalogProduct(ProductOut):
+    # Cache validators for ETag / Last-Modified; never part of a response body
+    version: int = Field(1, exclude=True)
+    updated_at: Optional[datetime] = Field(None, exclude=True)
+
+class ProductPage(BaseModel):
+    items: List[ProductOut]
+    next_cursor: Optional[int] = None
+
+class BulkRowError(BaseModel):
+    row: int  # 1-based data row, not counting a CSV header
+    error: str
+
+class BulkImportReport(BaseModel):
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[BulkRowError]
+
+class ProductSearchHit(ProductOut):
+    rank: float  # bm25 score, lower is more relevant
+
+class ProductSearchPage(BaseModel):
+    items: List[ProductSearchHit]
+    next_cursor: Optional[str] = None
+
 # Cart schemas
 class CartAdd(BaseModel):
     product_id: int
-    quantity: int
+    quantity: int = Field(gt=0)
 
-class CartItemOut(BaseModel):
+class CartBatchItem(BaseModel):
     product_id: int
+    quantity: int = Field(ge=0)  # 0 removes the line (replace only)
+
+class CartBatch(BaseModel):
+    items: List[CartBatchItem]
+    replace: bool = False  # set quantities instead of adding to them
+
+    @model_validator(mode="after")
+    def _positive_unless_replacing(self):
+        if not self.replace and any(item.quantity == 0 for item in self.items):
+            raise ValueError("quantity must be greater than 0 unless replace is set")
+        return self
+
+class CartItemOut(BaseModel):
+    product_id: Optional[int] = Field(
+        description="Null on past order lines whose product has since been deleted"
+    )
     quantity: int
     price_per_unit: float
     total_price: float
@@ -56,6 +101,35 @@ class CartItemOut(BaseModel):
 class OrderOut(BaseModel):
     id: int
     total_amount: float
+    created_at: Optional[datetime] = None
     items: List[CartItemOut]
 
     model_config = {"from_attributes": True}
+
+    @field_validator("created_at")
+    @classmethod
+    def _utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # SQLite returns naive UTC; always answer with an explicit UTC offset
+        return as_aware_utc(value) if value is not None else None
+
+class OrderPage(BaseModel):
+    items: List[OrderOut]
+    next_cursor: Optional[str] = None
+
+# Analytics schemas
+class DailyRevenueOut(BaseModel):
+    day: date
+    orders: int
+    units: int
+    revenue: float
+
+class ProductSalesOut(BaseModel):
+    product_id: int
+    name: Optional[str] = None  # None once the product has been deleted
+    orders: int
+    units: int
+    revenue: float
+
+class ProductSalesPage(BaseModel):
+    items: List[ProductSalesOut]
+    next_cursor: Optional[int] = None
@@ -0,0 +1,78 @@
+import hashlib
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .pagination import as_aware_utc
+from .serialization import FastJSONResponse
+
+# Responses are per user (every route here needs a token): caches may keep
+# them but must revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(parts: Iterable[Any]) -> str:
+    """
+    Weak ETag from the values that identify a representation's version
+    (ids, row versions, cursors). Weak, so it survives gzip.
+    """
+    raw = "\x1f".join(map(str, parts)).encode("utf-8")
+    return f'W/"{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluate If-None-Match (weak comparison), or If-Modified-Since when the
+    client sent no ETag, as RFC 9110 orders them
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return as_aware_utc(last_modified).replace(microsecond=0) <= as_aware_utc(since)
+    return False
+
+
+def precondition_failed(if_match: Optional[str], etag: str) -> bool:
+    """
+    True when an If-Match header is present and does not name the current
+    representation. Our ETags are all weak, so the comparison is weak too
+    (RFC 9110 asks for strong); they change with every write to the row.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return False
+    return _opaque(etag) not in {_opaque(tag) for tag in if_match.split(",")}
+
+
+def conditional_response(
+    request: Request,
+    content: Any,
+    etag: str,
+    last_modified: Optional[datetime] = None
+) -> Response:
+    """
+    304 with just the validators when the client's copy is current;
+    otherwise the JSON body. The body is only serialized in the second case.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(as_aware_utc(last_modified), usegmt=True)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(content, headers=headers)
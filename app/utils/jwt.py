@@ -1,15 +1,25 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import jwt, JWTError
-from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CACHE_ENABLED, TOKEN_CACHE_MAXSIZE
+)
+from .cache import TTLCache
+
+# Payloads of already-verified tokens, keyed by the token's SHA-256 digest
+token_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
-    Create a JWT token with optional expiration
+    Create a JWT token with optional expiration. Each token gets a unique
+    jti so it can be revoked on its own (see app/revocation.py).
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    from jose import jwt  # imported on first use; it is slow to import
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def decode_access_token(token: str) -> dict:
@@ -17,6 +27,24 @@ def decode_access_token(token: str) -> dict:
     Decode JWT token and return payload.
     Returns empty dict if invalid or expired.
     """
+    if not TOKEN_CACHE_ENABLED:
+        return _verify_token(token)
+
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload = _verify_token(token)
+    exp = payload.get("exp")
+    if exp is not None:
+        remaining = exp - time.time()
+        if remaining > 0:
+            token_cache.set(key, payload, ttl=remaining)
+    return payload
+
+def _verify_token(token: str) -> dict:
+    from jose import jwt, JWTError
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -0,0 +1,78 @@
+import base64
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+
+def keyset_page(rows: Sequence[T], limit: int, cursor: Callable[[T], Any]) -> tuple[list[T], Optional[Any]]:
+    """
+    Split rows fetched with LIMIT limit + 1 into the page and the cursor for
+    the next one: the extra row only tells that another page exists. The
+    cursor is built from the page's last row by cursor(), or None on the last page.
+    """
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    return rows, cursor(rows[-1])
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Encode a (created_at, id) keyset position as an opaque URL-safe cursor
+    """
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor. Raises 400 if it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    """
+    Encode a (search rank, id) keyset position as an opaque URL-safe cursor
+    """
+    raw = f"{rank!r}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    """
+    Decode a cursor produced by encode_rank_cursor. Raises 400 if it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        rank, row_id = raw.rsplit("|", 1)
+        return float(rank), int(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def as_naive_utc(value: datetime) -> datetime:
+    """
+    SQLite stores our timestamps as naive UTC; normalise client-supplied datetimes to match
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def as_aware_utc(value: datetime) -> datetime:
+    """
+    The reverse: SQLite hands our timestamps back naive; make them UTC-aware
+    before comparing them or sending them out (always with an offset)
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -1,11 +1,36 @@
-from passlib.context import CryptContext
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ..config import PASSWORD_HASH_WORKERS
+from ..metrics import timed
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # passlib (and its bcrypt backend) loads on the first hash, not at app import
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# bcrypt releases the GIL, so a small thread pool runs hashes in parallel
+# while bounding how many CPU-heavy hashes are in flight at once.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 def get_password_hash(password: str) -> str:
     truncated = password.encode("utf-8")[:72]  # bcrypt limit
-    return pwd_context.hash(truncated)
+    return get_pwd_context().hash(truncated)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     truncated = plain_password.encode("utf-8")[:72]
-    return pwd_context.verify(truncated, hashed_password)
+    return get_pwd_context().verify(truncated, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    with timed("bcrypt"):
+        return await loop.run_in_executor(_hash_executor, get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    with timed("bcrypt"):
+        return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
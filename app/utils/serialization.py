@@ -0,0 +1,45 @@
+from typing import Any, Iterable, Mapping
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; pydantic-core's encoder is the fallback
+    orjson = None
+    from pydantic_core import to_json
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode plain data (dicts, lists, row mappings, datetimes) as JSON bytes
+    """
+    if orjson is not None:
+        # OPT_UTC_Z writes UTC as "Z", like pydantic does for response models
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return to_json(content)
+
+
+def row_dicts(rows: Iterable[Mapping]) -> list[dict]:
+    """
+    Column-projection rows (Result.mappings()) as plain dicts for dumps()
+    """
+    return [dict(row) for row in rows]
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for content that is already in its final shape.
+
+    Routes that return it skip FastAPI's response_model validation; keep
+    response_model on the route so the OpenAPI schema stays accurate.
+    Pydantic models are dumped once with model_dump_json, anything else goes
+    through dumps().
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return dumps(content)
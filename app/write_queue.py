@@ -0,0 +1,206 @@
+"""
+Optional single-writer mode for SQLite (DB_WRITE_MODE=serialized).
+
+Write routes hand their unit of work to run_write() instead of run_db().
+By default that is the same thing: the unit runs on the request's session
+and commits on its own. In serialized mode the unit is queued for one
+dedicated writer thread that owns a single connection. The writer takes
+every queued unit (waiting up to DB_WRITE_MAX_WAIT_MS for more), runs each
+inside a SAVEPOINT of one transaction and commits them together, so
+concurrent writers neither contend for the file lock nor pay one fsync
+each.
+
+Units keep calling db.commit() and db.rollback(); on the writer's sessions
+those release or roll back the unit's SAVEPOINT. A unit that fails only
+loses its own changes. Work that must wait until the data is really
+committed (cache invalidation, waking other workers) goes through
+after_commit().
+
+Everything the running app writes goes through run_write(): routes, bulk
+import batches and the outbox worker. The exceptions are offline tools
+that run with the app's writer out of reach: migrations,
+`python -m app.analytics rebuild` and revocation.force_revoke(). They take
+the SQLite write lock like any other connection and wait (busy_timeout)
+for the writer's current batch.
+"""
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import DB_WRITE_MODE, DB_WRITE_MAX_BATCH, DB_WRITE_MAX_WAIT_MS
+from .database import SessionLocal, create_db_engine, run_db
+from .metrics import instrument_engine
+
+logger = logging.getLogger("app.write_queue")
+
+
+class _Job(NamedTuple):
+    fn: Callable
+    args: tuple
+    kwargs: dict
+    context: contextvars.Context  # the caller's, so SQL is counted against its request
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+
+
+def after_commit(db: Session, callback: Callable[[], Any]) -> None:
+    """
+    Run callback once the unit's committed changes are durable: right away
+    on an ordinary session, after the group commit on a writer session.
+    """
+    pending = db.info.get("after_commit")
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+def _resolve(future: asyncio.Future, ok: bool, value) -> None:
+    if future.done():  # the caller went away
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+class GroupCommitWriter:
+    def __init__(self, max_batch: int = DB_WRITE_MAX_BATCH, max_wait_ms: float = DB_WRITE_MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._engine = None
+        # Exposed through metrics()
+        self.batches = 0
+        self.units = 0
+
+    async def submit(self, fn: Callable, *args, **kwargs):
+        """
+        Queue fn(session, *args, **kwargs) and wait for its result
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put(_Job(fn, args, kwargs, contextvars.copy_context(), loop, future))
+        return await future
+
+    def stop(self) -> None:
+        """
+        Finish the queued units and stop the writer thread
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                if self._engine is None:
+                    self._engine = _writer_engine()
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._commit_batch(batch)
+            if stopping:
+                return
+
+    def _commit_batch(self, batch: list[_Job]) -> None:
+        outcomes = []
+        callbacks = []
+        try:
+            with self._engine.connect() as conn:
+                with conn.begin():
+                    for job in batch:
+                        db = SessionLocal(bind=conn, join_transaction_mode="create_savepoint")
+                        db.info["after_commit"] = callbacks
+                        try:
+                            outcomes.append((True, job.context.run(job.fn, db, *job.args, **job.kwargs)))
+                        except Exception as e:
+                            outcomes.append((False, e))
+                        finally:
+                            db.close()  # rolls back whatever the unit did not commit
+        except Exception as e:
+            # The group commit itself failed: none of the batch was written
+            logger.exception("group commit of %d unit(s) failed", len(batch))
+            outcomes = [(False, e)] * len(batch)
+            callbacks = []
+
+        self.batches += 1
+        self.units += len(batch)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("after_commit callback failed")
+        for job, (ok, value) in zip(batch, outcomes):
+            if not job.loop.is_closed():
+                job.loop.call_soon_threadsafe(_resolve, job.future, ok, value)
+
+    def metrics(self):
+        yield "# TYPE db_write_queue_depth gauge"
+        yield f"db_write_queue_depth {self._queue.qsize()}"
+        yield "# TYPE db_write_batches_total counter"
+        yield f"db_write_batches_total {self.batches}"
+        yield "# TYPE db_write_units_total counter"
+        yield f"db_write_units_total {self.units}"
+
+
+def _writer_engine():
+    # One connection that issues BEGIN IMMEDIATE itself: pysqlite would
+    # otherwise let the first SAVEPOINT open (and its RELEASE commit) the
+    # transaction, defeating the group commit
+    engine = create_db_engine()
+
+    @event.listens_for(engine, "connect")
+    def _autocommit_driver(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    instrument_engine(engine)
+    return engine
+
+
+writer = GroupCommitWriter() if DB_WRITE_MODE == "serialized" else None
+
+
+async def run_write(db, fn: Callable, *args, **kwargs):
+    """
+    run_db() for units that commit: goes through the single writer when
+    DB_WRITE_MODE=serialized, and runs on the request's session otherwise.
+    """
+    if writer is not None:
+        return await writer.submit(fn, *args, **kwargs)
+    return await run_db(db, fn, *args, **kwargs)
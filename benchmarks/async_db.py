@@ -0,0 +1,95 @@
+"""
+Sync vs async database path, side by side, under concurrent catalog and cart reads.
+
+The same app is driven twice in-process: once with the sync Session path
+(each request's DB work takes a threadpool worker) and once with the async
+path (DB_ASYNC, work runs on the event loop). Reports req/s and latency.
+
+Usage:
+    python benchmarks/async_db.py [--requests 4000] [--concurrency 200]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from common import asgi_client, create_schema, percentile, use_temp_database
+
+PRODUCTS = 2000
+
+
+def seed():
+    from app.database import SessionLocal
+    from app.models import Product
+
+    with SessionLocal() as db:
+        db.add_all(
+            Product(name=f"Product {i}", description="", price=1.0 + i, stock=100)
+            for i in range(PRODUCTS)
+        )
+        db.commit()
+
+
+async def drive(app, headers, total: int, concurrency: int) -> dict:
+    latencies = []
+    queue = asyncio.Queue()
+    rng = random.Random(7)
+    for _ in range(total):
+        queue.put_nowait(
+            f"/products/{rng.randint(1, PRODUCTS)}" if rng.random() < 0.7 else "/cart/"
+        )
+
+    async with asgi_client(app) as client:
+        async def worker():
+            while not queue.empty():
+                path = queue.get_nowait()
+                start = time.perf_counter()
+                await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "req_per_sec": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def run(total: int, concurrency: int):
+    from app.main import app
+    from app.database import get_read_session, get_write_session, get_db, get_async_db, get_read_db, get_async_read_db
+
+    async with asgi_client(app) as client:
+        credentials = {"email": "bench@example.com", "password": "Bench123!"}
+        await client.post("/users/register", json=credentials)
+        token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/cart/batch", json={"items": [{"product_id": i, "quantity": 1} for i in range(1, 6)]},
+                          headers=headers)
+
+    print(f"{'path':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, write_dependency, read_dependency in (("sync", get_db, get_read_db), ("async", get_async_db, get_async_read_db)):
+        app.dependency_overrides[get_write_session] = write_dependency
+        app.dependency_overrides[get_read_session] = read_dependency
+        r = await drive(app, headers, total, concurrency)
+        print(f"{name:<8}{r['req_per_sec']:>10.0f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+    app.dependency_overrides.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temp_database()
+    create_schema()
+    seed()
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
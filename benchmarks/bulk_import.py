@@ -0,0 +1,84 @@
+"""
+Bulk import/export throughput.
+
+Streams --rows generated products into POST /products/bulk (as CSV or
+NDJSON, sent as a chunked body so neither side holds the whole file), then
+reads them back through GET /products/export and reports rows/sec.
+
+Usage:
+    python benchmarks/bulk_import.py [--rows 100000] [--format csv|ndjson]
+"""
+import argparse
+import json
+import time
+
+from common import asgi_client, create_schema, use_temp_database
+
+use_temp_database()
+
+import asyncio
+
+
+async def generate(rows: int, fmt: str, chunk_rows: int = 1000):
+    if fmt == "csv":
+        yield b"name,description,price,stock\n"
+    lines = []
+    for i in range(rows):
+        if fmt == "csv":
+            lines.append(f'Bulk item {i},"imported, in bulk",{i % 500 + 0.99},{i % 50}\n')
+        else:
+            lines.append(json.dumps({
+                "name": f"Bulk item {i}", "description": "imported, in bulk",
+                "price": i % 500 + 0.99, "stock": i % 50,
+            }) + "\n")
+        if len(lines) == chunk_rows:
+            yield "".join(lines).encode()
+            lines.clear()
+    if lines:
+        yield "".join(lines).encode()
+
+
+async def run(app, rows: int, fmt: str):
+    credentials = {"email": "bulk@example.com", "password": "Bulk123!"}
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+
+    async with asgi_client(app) as client:
+        await client.post("/users/register", json=credentials)
+        token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        start = time.perf_counter()
+        response = await client.post(
+            "/products/bulk", content=generate(rows, fmt),
+            headers={**headers, "Content-Type": content_type}, timeout=None
+        )
+        elapsed = time.perf_counter() - start
+        report = response.json()
+        print(f"import  {report['inserted']} inserted, {report['failed']} failed "
+              f"in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+
+        start = time.perf_counter()
+        exported = 0
+        async with client.stream("GET", f"/products/export?format={fmt}", headers=headers, timeout=None) as response:
+            async for line in response.aiter_lines():
+                exported += bool(line)
+        elapsed = time.perf_counter() - start
+        exported -= fmt == "csv"
+        print(f"export  {exported} rows in {elapsed:.2f}s ({exported / elapsed:,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    args = parser.parse_args()
+
+    create_schema()
+
+    from app.main import app
+
+    asyncio.run(run(app, args.rows, args.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Shared setup for the benchmark scripts: a throwaway SQLite database and an
+in-process ASGI client, so no server or network is needed.
+
+The client is httpx, which the app itself does not need; install it with the
+app's requirements before running any script here:
+
+    pip install -r benchmarks/requirements.txt
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+def use_temp_database() -> str:
+    """Point DB_PATH at a fresh temp file. Call before importing anything from app."""
+    path = os.path.join(tempfile.mkdtemp(prefix="shop-bench-"), "shop.db")
+    os.environ["DB_PATH"] = path
+    return path
+
+
+def create_schema():
+    """Build the schema with the Alembic migrations (includes the FTS table and triggers)."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    command.upgrade(config, "head")
+
+
+def asgi_client(app):
+    import httpx
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
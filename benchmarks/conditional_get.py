@@ -0,0 +1,115 @@
+"""
+Bandwidth and CPU of polling clients: full responses vs gzip vs conditional GETs.
+
+A client polls GET /products/?limit=N, GET /products/{id} and GET /users/orders
+while nothing changes, three ways: plain (Accept-Encoding: identity, no
+validators), gzip only, and gzip plus If-None-Match with the ETag of its
+previous response. Reports response body bytes and CPU time per request
+(process CPU of the in-process client and server together).
+
+Usage:
+    python benchmarks/conditional_get.py [--polls 500] [--page-size 50]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import asgi_client, create_schema, use_temp_database
+
+PRODUCTS = 2000
+ORDERS = 20
+WORDS = "red blue green steel wooden compact deluxe travel kitchen garden office lamp chair desk mug kettle".split()
+
+
+def seed() -> dict:
+    """Seed products and one user's order history directly; returns auth headers."""
+    from sqlalchemy import insert, select
+    from app.database import SessionLocal
+    from app.models import Order, OrderItem, Product, User
+    from app.utils.jwt import create_access_token
+
+    rng = random.Random(3)
+    with SessionLocal() as db:
+        db.execute(insert(Product), [
+            {
+                "name": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+                "description": " ".join(rng.choices(WORDS, k=20)),
+                "price": round(rng.uniform(1, 500), 2),
+                "stock": 1000,
+            }
+            for i in range(PRODUCTS)
+        ])
+        db.add(User(email="poll@example.com", hashed_password="x"))
+        db.flush()
+        user_id = db.scalar(select(User.id))
+        now = datetime.now(timezone.utc)
+        order_ids = db.scalars(
+            insert(Order).returning(Order.id),
+            [{"user_id": user_id, "total_amount": 0.0, "created_at": now - timedelta(days=i)} for i in range(ORDERS)]
+        ).all()
+        db.execute(insert(OrderItem), [
+            {"order_id": order_id, "product_id": rng.randint(1, PRODUCTS), "quantity": 1, "price": 9.99}
+            for order_id in order_ids
+            for _ in range(5)
+        ])
+        db.commit()
+    return {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+
+
+MODES = ("plain", "gzip", "conditional")
+
+
+async def poll(client, headers: dict, path: str, polls: int) -> dict:
+    """Poll path in all three modes, interleaved so drift in machine load hits them equally."""
+    state = {
+        mode: {
+            "headers": dict(headers, **{"Accept-Encoding": "identity" if mode == "plain" else "gzip"}),
+            "bytes": 0, "cpu": 0.0, "not_modified": 0,
+        }
+        for mode in MODES
+    }
+    for _ in range(polls):
+        for mode, s in state.items():
+            start = time.process_time()
+            response = await client.get(path, headers=s["headers"])
+            s["cpu"] += time.process_time() - start
+            s["bytes"] += response.num_bytes_downloaded
+            s["not_modified"] += response.status_code == 304
+            if mode == "conditional":
+                s["headers"]["If-None-Match"] = response.headers["etag"]
+    return {
+        mode: {"bytes": s["bytes"] / polls, "cpu_ms": s["cpu"] / polls * 1000, "not_modified": s["not_modified"]}
+        for mode, s in state.items()
+    }
+
+
+async def run(headers: dict, polls: int, page_size: int):
+    from app.main import app
+
+    paths = (f"/products/?limit={page_size}", "/products/42", "/users/orders")
+    async with asgi_client(app) as client:
+        for path in paths:  # warm caches
+            await client.get(path, headers=headers)
+
+        print(f"{'endpoint':<24}{'mode':<13}{'bytes/req':>11}{'CPU ms/req':>12}{'304s':>7}")
+        for path in paths:
+            for mode, r in (await poll(client, headers, path, polls)).items():
+                print(f"{path:<24}{mode:<13}{r['bytes']:>11.0f}{r['cpu_ms']:>12.3f}{r['not_modified']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    use_temp_database()
+    create_schema()
+    headers = seed()
+    asyncio.run(run(headers, args.polls, args.page_size))
+
+
+if __name__ == "__main__":
+    main()
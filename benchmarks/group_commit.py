@@ -0,0 +1,116 @@
+"""
+Direct vs serialized (group-commit) writes under many concurrent cart writers.
+
+Each writer is its own user adding items to its own cart through POST /cart/,
+so the only thing they share is the SQLite write lock. The same app is driven
+twice in-process: once with every request committing on its own session
+(DB_WRITE_MODE=direct, today's behaviour) and once with all write units
+going through the single group-commit writer. Reports req/s, latency
+percentiles, failed requests and, for the writer, the average group size.
+
+Usage:
+    python benchmarks/group_commit.py [--writers 128] [--requests 20] [--synchronous FULL] [--async]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from common import asgi_client, create_schema, percentile, use_temp_database
+
+PRODUCTS = 1000
+
+
+def seed(writers: int) -> list[dict]:
+    """Create the users and products directly; returns one auth header per writer."""
+    from sqlalchemy import insert, select
+    from app.database import SessionLocal
+    from app.models import Product, User
+    from app.utils.jwt import create_access_token
+
+    with SessionLocal() as db:
+        db.execute(insert(User), [{"email": f"writer{i}@example.com", "hashed_password": "x"} for i in range(writers)])
+        db.execute(insert(Product), [
+            {"name": f"Product {i}", "description": "", "price": 1.0 + i, "stock": 1_000_000} for i in range(PRODUCTS)
+        ])
+        db.commit()
+        user_ids = list(db.scalars(select(User.id)))
+    return [
+        {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+        for user_id in user_ids
+    ]
+
+
+async def drive(app, headers: list[dict], per_writer: int) -> dict:
+    latencies = []
+    failures = 0
+
+    async with asgi_client(app) as client:
+        async def writer(h, rng):
+            nonlocal failures
+            for _ in range(per_writer):
+                item = {"product_id": rng.randint(1, PRODUCTS), "quantity": 1}
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/cart/", json=item, headers=h)
+                    ok = response.status_code == 200
+                except Exception:  # e.g. "database is locked" escaping the app
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                failures += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(writer(h, random.Random(i)) for i, h in enumerate(headers)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "req_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "failed": failures,
+    }
+
+
+async def run(headers: list[dict], per_writer: int):
+    from app import write_queue
+    from app.main import app
+
+    # Warm the user cache (a few at a time) so both runs measure the write path only
+    async with asgi_client(app) as client:
+        for i in range(0, len(headers), 16):
+            await asyncio.gather(*(client.get("/users/me", headers=h) for h in headers[i:i + 16]))
+
+    print(f"{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'failed':>8}{'avg group':>11}")
+    for mode in ("direct", "serialized"):
+        writer = write_queue.GroupCommitWriter() if mode == "serialized" else None
+        write_queue.writer = writer
+        r = await drive(app, headers, per_writer)
+        group = f"{writer.units / writer.batches:.1f}" if writer and writer.batches else "-"
+        print(f"{mode:<12}{r['req_per_sec']:>10.0f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['max_ms']:>10.1f}{r['failed']:>8}{group:>11}")
+        if writer is not None:
+            await asyncio.to_thread(writer.stop)
+    write_queue.writer = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=128)
+    parser.add_argument("--requests", type=int, default=20, help="requests per writer")
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous (FULL makes every commit fsync)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="use the async DB path for direct writes")
+    args = parser.parse_args()
+
+    use_temp_database()
+    os.environ["DB_SYNCHRONOUS"] = args.synchronous
+    os.environ["DB_ASYNC"] = "1" if args.use_async else "0"
+    os.environ["DB_WRITE_MODE"] = "direct"
+    create_schema()
+    headers = seed(args.writers)
+    asyncio.run(run(headers, args.requests))
+
+
+if __name__ == "__main__":
+    main()
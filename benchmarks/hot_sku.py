@@ -0,0 +1,150 @@
+"""
+Many buyers racing for the last units of one hot product.
+
+Every buyer is its own user: it adds one unit of the same product to its cart
+(taking a stock hold) and checks out. There are more buyers than units, so
+most must be turned away with a 409. Runs with direct writes and with the
+group-commit writer, then checks that nothing was oversold: orders, order
+lines, remaining stock and leftover holds must all add up. Exits with
+status 1 if they do not.
+
+Usage:
+    python benchmarks/hot_sku.py [--buyers 500] [--stock 100] [--async]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from common import asgi_client, create_schema, percentile, use_temp_database
+
+
+def seed(buyers: int, stock: int) -> list[dict]:
+    """Create the buyers and one product per run; returns one auth header per buyer."""
+    from sqlalchemy import insert, select
+    from app.database import SessionLocal
+    from app.models import Product, User
+    from app.utils.jwt import create_access_token
+
+    with SessionLocal() as db:
+        db.execute(insert(User), [{"email": f"buyer{i}@example.com", "hashed_password": "x"} for i in range(buyers)])
+        db.execute(insert(Product), [
+            {"name": f"Hot product ({mode})", "description": "", "price": 9.99, "stock": stock}
+            for mode in ("direct", "serialized")
+        ])
+        db.commit()
+        user_ids = list(db.scalars(select(User.id)))
+    return [
+        {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+        for user_id in user_ids
+    ]
+
+
+async def drive(app, headers: list[dict], product_id: int) -> dict:
+    latencies = []
+    outcomes = {"sold": 0, "add_409": 0, "checkout_409": 0, "failed": 0}
+
+    async with asgi_client(app) as client:
+        async def buyer(h):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=h)
+                if response.status_code == 200:
+                    response = await client.post("/cart/checkout", headers=h)
+                    outcome = {200: "sold", 409: "checkout_409"}.get(response.status_code, "failed")
+                else:
+                    outcome = "add_409" if response.status_code == 409 else "failed"
+            except Exception:  # e.g. "database is locked" escaping the app
+                outcome = "failed"
+            latencies.append(time.perf_counter() - start)
+            outcomes[outcome] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(buyer(h) for h in headers))
+        elapsed = time.perf_counter() - start
+
+    return dict(
+        outcomes,
+        buyers_per_sec=len(latencies) / elapsed,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+    )
+
+
+def audit(product_id: int, stock: int) -> str:
+    """Cross-check the database after a run; returns 'ok' or what does not add up."""
+    from sqlalchemy import func, select
+    from app import inventory
+    from app.database import SessionLocal
+    from app.models import OrderItem, Product, StockReservation
+
+    with SessionLocal() as db:
+        # Expired holds are only swept on cart writes; return them now so they count as stock
+        inventory.release_expired(db)
+        db.commit()
+        negative_stock = db.scalar(select(func.count()).where(Product.stock < 0))
+        bad_holds = db.scalar(select(func.count()).where(StockReservation.quantity <= 0))
+        remaining = db.scalar(select(Product.stock).where(Product.id == product_id))
+        sold = db.scalar(select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.product_id == product_id))
+        held = db.scalar(
+            select(func.coalesce(func.sum(StockReservation.quantity), 0)).where(StockReservation.product_id == product_id)
+        )
+    problems = []
+    if negative_stock:
+        problems.append(f"{negative_stock} product(s) with negative stock")
+    if bad_holds:
+        problems.append(f"{bad_holds} hold(s) with a non-positive quantity")
+    if sold + remaining + held != stock:
+        problems.append(f"sold {sold} + stock {remaining} + held {held} != {stock}")
+    if held:
+        problems.append(f"{held} unit(s) still held")
+    return "; ".join(problems) or "ok"
+
+
+async def run(headers: list[dict], stock: int) -> bool:
+    from app import inventory, write_queue
+    from app.main import app
+
+    # Warm the user cache (a few at a time) so the runs measure the write path only
+    async with asgi_client(app) as client:
+        for i in range(0, len(headers), 16):
+            await asyncio.gather(*(client.get("/users/me", headers=h) for h in headers[i:i + 16]))
+
+    print(f"{'mode':<12}{'buyers/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'sold':>6}{'add 409':>9}"
+          f"{'co 409':>8}{'failed':>8}{'CAS retries':>13}  audit")
+    ok = True
+    for product_id, mode in enumerate(("direct", "serialized"), start=1):
+        writer = write_queue.GroupCommitWriter() if mode == "serialized" else None
+        write_queue.writer = writer
+        retries_before = inventory.stats.cas_retries
+        r = await drive(app, headers, product_id)
+        if writer is not None:
+            await asyncio.to_thread(writer.stop)
+        result = audit(product_id, stock)
+        ok = ok and result == "ok"
+        print(f"{mode:<12}{r['buyers_per_sec']:>10.0f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['sold']:>6}"
+              f"{r['add_409']:>9}{r['checkout_409']:>8}{r['failed']:>8}"
+              f"{inventory.stats.cas_retries - retries_before:>13}  {result}")
+    write_queue.writer = None
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--async", dest="use_async", action="store_true", help="use the async DB path for direct writes")
+    args = parser.parse_args()
+
+    use_temp_database()
+    os.environ["DB_ASYNC"] = "1" if args.use_async else "0"
+    os.environ["DB_WRITE_MODE"] = "direct"
+    create_schema()
+    headers = seed(args.buyers, args.stock)
+    if not asyncio.run(run(headers, args.stock)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Per-request JWT verification cost, with and without the verified-token cache.
+
+Usage:
+    python benchmarks/jwt_decode.py [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import jwt as jwt_utils
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = jwt_utils.create_access_token({"sub": "1"})
+
+    uncached = timeit.timeit(lambda: jwt_utils._verify_token(token), number=args.iterations)
+
+    jwt_utils.token_cache.clear()
+    jwt_utils.decode_access_token(token)  # warm the cache
+    cached = timeit.timeit(lambda: jwt_utils.decode_access_token(token), number=args.iterations)
+
+    per_uncached = uncached / args.iterations * 1e6
+    per_cached = cached / args.iterations * 1e6
+    print(f"iterations:        {args.iterations}")
+    print(f"full jwt.decode:   {per_uncached:8.2f} us/request")
+    print(f"verified cache:    {per_cached:8.2f} us/request")
+    print(f"speedup:           {per_uncached / per_cached:8.1f}x")
+    print(f"cache stats:       {jwt_utils.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Load test: replay a weighted request mix against the app in-process.
+
+Seeds a fresh database with --users users (each with a cart and order
+history) and --products products, then sends --requests requests from
+--concurrency concurrent clients through the ASGI transport (no server or
+network). Requests are drawn from a mix file, one JSON object per line:
+
+    {"route": "get_product", "weight": 25, "method": "GET", "path": "/products/{product_id}"}
+
+Optional keys: "json" (request body) and "expect" (accepted status codes,
+default [200]). Strings may use the placeholders {product_id}, {quantity},
+{price} and {word}; a string that is exactly one placeholder is replaced by
+the typed value. See benchmarks/mixes/ for the shipped mixes.
+
+Reports per-route throughput, p50/p95/p99 latency and SQL statements per
+request, and writes the results as JSON (pass --baseline with an earlier
+results file to print the change per route).
+
+Usage:
+    python benchmarks/load_test.py [--mix benchmarks/mixes/default.jsonl]
+        [--users 200] [--products 10000] [--requests 5000] [--concurrency 50]
+        [--out results.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from common import ROOT, asgi_client, create_schema, percentile, use_temp_database
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike "
+    "november oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu"
+).split()
+BATCH = 5000
+
+# Statements issued on behalf of the request currently being timed
+_statements = contextvars.ContextVar("statements", default=None)
+
+
+def load_mix(path: str) -> list[dict]:
+    with open(path) as f:
+        mix = [json.loads(line) for line in f if line.strip()]
+    for entry in mix:
+        entry.setdefault("weight", 1)
+        entry.setdefault("expect", [200])
+    return mix
+
+
+def seed(users: int, products: int, cart_items: int, orders: int, order_items: int) -> list[int]:
+    """Seed the database directly (no HTTP, one bcrypt hash); returns the user ids."""
+    from sqlalchemy import insert, select
+    from app.database import SessionLocal
+    from app.models import CartItem, Order, OrderItem, Product, User
+    from app.utils.security import get_password_hash
+
+    rng = random.Random(1)
+    hashed = get_password_hash("Load123!")
+
+    def insert_in_batches(db, model, rows):
+        for i in range(0, len(rows), BATCH):
+            db.execute(insert(model), rows[i:i + BATCH])
+
+    with SessionLocal() as db:
+        insert_in_batches(db, User, [
+            {"email": f"load{i}@example.com", "hashed_password": hashed} for i in range(users)
+        ])
+        insert_in_batches(db, Product, [
+            {
+                "name": " ".join(rng.sample(WORDS, 2)) + f" {i}",
+                "description": " ".join(rng.choices(WORDS, k=8)),
+                "price": round(rng.uniform(1, 500), 2),
+                "stock": 1_000_000,
+            }
+            for i in range(products)
+        ])
+        user_ids = list(db.scalars(select(User.id)))
+
+        insert_in_batches(db, CartItem, [
+            {"user_id": user_id, "product_id": product_id, "quantity": rng.randint(1, 3)}
+            for user_id in user_ids
+            for product_id in rng.sample(range(1, products + 1), cart_items)
+        ])
+
+        now = datetime.now(timezone.utc)
+        insert_in_batches(db, Order, [
+            {"user_id": user_id, "total_amount": 0.0, "created_at": now - timedelta(hours=rng.randint(1, 24 * 365))}
+            for user_id in user_ids
+            for _ in range(orders)
+        ])
+        order_ids = list(db.scalars(select(Order.id)))
+        insert_in_batches(db, OrderItem, [
+            {
+                "order_id": order_id, "product_id": rng.randint(1, products),
+                "quantity": rng.randint(1, 3), "price": round(rng.uniform(1, 500), 2),
+            }
+            for order_id in order_ids
+            for _ in range(order_items)
+        ])
+        db.commit()
+    return user_ids
+
+
+def render(value, values: dict):
+    if isinstance(value, str):
+        if value.startswith("{") and value.endswith("}") and value[1:-1] in values:
+            return values[value[1:-1]]
+        return value.format(**values)
+    if isinstance(value, dict):
+        return {k: render(v, values) for k, v in value.items()}
+    if isinstance(value, list):
+        return [render(v, values) for v in value]
+    return value
+
+
+async def drive(app, mix: list[dict], tokens: list[str], products: int,
+                total: int, concurrency: int, record: bool) -> tuple[dict, float]:
+    rng = random.Random(2)
+    plan = rng.choices(mix, weights=[entry["weight"] for entry in mix], k=total)
+    samples = defaultdict(lambda: {"latencies": [], "statements": [], "statuses": defaultdict(int), "errors": 0})
+    queue = asyncio.Queue()
+    for entry in plan:
+        queue.put_nowait(entry)
+
+    async with asgi_client(app) as client:
+        async def worker(seed_value: int):
+            local = random.Random(seed_value)
+            while not queue.empty():
+                entry = queue.get_nowait()
+                values = {
+                    "product_id": local.randint(1, products),
+                    "quantity": local.randint(1, 3),
+                    "price": round(local.uniform(1, 500), 2),
+                    "word": local.choice(WORDS),
+                }
+                headers = {"Authorization": f"Bearer {local.choice(tokens)}"}
+                kwargs = {"json": render(entry["json"], values)} if "json" in entry else {}
+
+                counter = [0]
+                _statements.set(counter)
+                start = time.perf_counter()
+                response = await client.request(
+                    entry["method"], render(entry["path"], values), headers=headers, **kwargs
+                )
+                elapsed = time.perf_counter() - start
+                if not record:
+                    continue
+                route = samples[entry["route"]]
+                route["latencies"].append(elapsed)
+                route["statements"].append(counter[0])
+                route["statuses"][response.status_code] += 1
+                route["errors"] += response.status_code not in entry["expect"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        wall = time.perf_counter() - start
+    return samples, wall
+
+
+def summarize(samples: dict, wall: float) -> dict:
+    routes = {}
+    for name, route in sorted(samples.items()):
+        latencies = route["latencies"]
+        routes[name] = {
+            "requests": len(latencies),
+            "errors": route["errors"],
+            "statuses": {str(k): v for k, v in sorted(route["statuses"].items())},
+            "req_per_sec": len(latencies) / wall,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "sql_per_request": sum(route["statements"]) / len(latencies),
+        }
+    latencies = [t for route in samples.values() for t in route["latencies"]]
+    overall = {
+        "requests": len(latencies),
+        "errors": sum(route["errors"] for route in samples.values()),
+        "req_per_sec": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "sql_per_request": sum(sum(route["statements"]) for route in samples.values()) / max(len(latencies), 1),
+        "seconds": wall,
+    }
+    return {"routes": routes, "overall": overall}
+
+
+def print_report(results: dict, baseline: dict = None):
+    header = f"{'route':<22}{'reqs':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql/req':>9}"
+    if baseline:
+        header += f"{'p95 vs base':>13}"
+    print(header)
+    rows = list(results["routes"].items()) + [("(all)", results["overall"])]
+    for name, r in rows:
+        line = (f"{name:<22}{r['requests']:>7}{r['errors']:>5}{r['req_per_sec']:>9.0f}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                f"{r['sql_per_request']:>9.1f}")
+        if baseline:
+            before = baseline["routes"].get(name) if name != "(all)" else baseline["overall"]
+            if before and before["p95_ms"]:
+                line += f"{(r['p95_ms'] / before['p95_ms'] - 1) * 100:>+12.0f}%"
+        print(line)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mix", default=os.path.join(ROOT, "benchmarks", "mixes", "default.jsonl"))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--cart-items", type=int, default=3, help="cart lines seeded per user")
+    parser.add_argument("--orders", type=int, default=5, help="orders seeded per user")
+    parser.add_argument("--order-items", type=int, default=3, help="items per seeded order")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200, help="untimed requests sent first")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--out", help="results file (default benchmarks/results/<mix>-<time>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare p95 against")
+    args = parser.parse_args()
+
+    mix = load_mix(args.mix)
+    use_temp_database()
+    create_schema()
+    start = time.perf_counter()
+    user_ids = seed(args.users, args.products, args.cart_items, args.orders, args.order_items)
+    print(f"seeded {args.users} users, {args.products} products in {time.perf_counter() - start:.1f}s")
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from app import config
+    from app.main import app
+    from app.utils.jwt import create_access_token
+
+    # Listening on the Engine class also covers the lazily built async engine
+    @event.listens_for(Engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter = _statements.get()
+        if counter is not None:
+            counter[0] += 1
+
+    tokens = [create_access_token({"sub": str(user_id)}) for user_id in user_ids]
+
+    async def run():
+        # One event loop for both passes: the async engine's pool is bound to it
+        if args.warmup:
+            await drive(app, mix, tokens, args.products, args.warmup, args.concurrency, record=False)
+        return await drive(app, mix, tokens, args.products, args.requests, args.concurrency, record=True)
+
+    samples, wall = asyncio.run(run())
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "mix": os.path.basename(args.mix),
+        "args": vars(args),
+        "settings": {
+            "DB_PROFILE": config.DB_PROFILE,
+            "DB_ASYNC": config.DB_ASYNC,
+            "CATALOG_CACHE_ENABLED": config.CATALOG_CACHE_ENABLED,
+            "USER_CACHE_ENABLED": config.USER_CACHE_ENABLED,
+            "TOKEN_CACHE_ENABLED": config.TOKEN_CACHE_ENABLED,
+        },
+        **summarize(samples, wall),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    out = args.out
+    if not out:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        mix_name = os.path.splitext(os.path.basename(args.mix))[0]
+        out = os.path.join(ROOT, "benchmarks", "results", f"{mix_name}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Latency of a cheap authenticated route while a burst of logins runs.
+
+With --inline, bcrypt runs directly on the event loop (the old behaviour),
+so every login stalls unrelated requests for the length of a hash.
+
+Usage:
+    python benchmarks/login_burst.py [--logins 40] [--inline]
+"""
+import argparse
+import asyncio
+import time
+
+from common import asgi_client, create_schema, percentile, use_temp_database
+
+
+async def run(logins: int):
+    from app.main import app
+
+    async with asgi_client(app) as client:
+        credentials = {"email": "bench@example.com", "password": "Bench123!"}
+        await client.post("/users/register", json=credentials)
+        token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        probe_latencies = []
+        burst_done = asyncio.Event()
+
+        async def probe():
+            while not burst_done.is_set():
+                start = time.perf_counter()
+                await client.get("/users/me", headers=headers)
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        async def burst():
+            await asyncio.gather(*(client.post("/auth/login", json=credentials) for _ in range(logins)))
+            burst_done.set()
+
+        start = time.perf_counter()
+        await asyncio.gather(probe(), burst())
+        elapsed = time.perf_counter() - start
+
+    print(f"logins:            {logins} in {elapsed:.2f}s ({logins / elapsed:.1f}/s)")
+    print(f"/users/me probes:  {len(probe_latencies)}")
+    print(f"probe p50:         {percentile(probe_latencies, 50) * 1000:8.1f} ms")
+    print(f"probe p99:         {percentile(probe_latencies, 99) * 1000:8.1f} ms")
+    print(f"probe max:         {max(probe_latencies) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--inline", action="store_true", help="verify passwords on the event loop")
+    args = parser.parse_args()
+
+    use_temp_database()
+    create_schema()
+
+    if args.inline:
+        from app.utils import security
+        from app.routers import auth
+
+        async def verify_inline(plain_password, hashed_password):
+            return security.verify_password(plain_password, hashed_password)
+
+        auth.verify_password_async = verify_inline
+
+    asyncio.run(run(args.logins))
+
+
+if __name__ == "__main__":
+    main()
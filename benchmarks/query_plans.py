@@ -0,0 +1,145 @@
+"""
+Query-plan regression check for the hot routes.
+
+Drives each hot route in-process with the user and catalog caches off, so
+every query reaches SQLite, captures the SQL it issues, and runs EXPLAIN
+QUERY PLAN on each statement. Exits non-zero if any plan falls back to a
+full table SCAN.
+
+Allowed scans:
+  * FTS5 virtual-table scans (those are index lookups inside FTS5)
+  * unfiltered ordered scans cut short by LIMIT with no temp b-tree sort
+    (keyset first pages walk the primary key and stop early)
+
+Usage:
+    python benchmarks/query_plans.py [-v]
+"""
+import argparse
+import os
+import re
+import sys
+
+from common import asgi_client, create_schema, use_temp_database
+
+use_temp_database()
+os.environ["USER_CACHE_ENABLED"] = "0"
+os.environ["TOKEN_CACHE_ENABLED"] = "0"
+os.environ["CATALOG_CACHE_ENABLED"] = "0"
+
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def is_regression(statement: str, plan: list[str]) -> bool:
+    for detail in plan:
+        if not detail.startswith("SCAN "):
+            continue
+        if "VIRTUAL TABLE" in detail:
+            continue
+        bounded = re.search(r"\bLIMIT\b", statement, re.IGNORECASE)
+        filtered = re.search(r"\bWHERE\b", statement, re.IGNORECASE)
+        sorted_in_memory = any("TEMP B-TREE" in d for d in plan)
+        if bounded and not filtered and not sorted_in_memory:
+            continue
+        return True
+    return False
+
+
+async def exercise(app, captured: dict):
+    credentials = {"email": "plans@example.com", "password": "Plans123!"}
+
+    async def hit(route: str, method: str, url: str, **kwargs):
+        captured["route"] = route
+        response = await client.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise SystemExit(f"{route}: {method} {url} -> {response.status_code} {response.text}")
+        return response
+
+    async with asgi_client(app) as client:
+        await hit("register_user", "POST", "/users/register", json=credentials)
+        token = (await hit("login_user", "POST", "/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for i in range(5):
+            await hit("create_product", "POST", "/products/", headers=headers, json={
+                "name": f"Plan widget {i}", "description": "query plan widget", "price": 10 + i, "stock": 100,
+            })
+        await hit("get_me", "GET", "/users/me", headers=headers)
+        await hit("list_products", "GET", "/products/?limit=2", headers=headers)
+        await hit("list_products", "GET", "/products/?limit=2&after=2", headers=headers)
+        await hit("get_product", "GET", "/products/3", headers=headers)
+        await hit("search_products", "GET", "/products/search?q=widget&min_price=5&in_stock=true", headers=headers)
+        await hit("update_product", "PUT", "/products/3", headers=headers, json={
+            "name": "Plan widget 3", "description": "updated", "price": 13, "stock": 100,
+        })
+        await hit("add_to_cart", "POST", "/cart/", headers=headers, json={"product_id": 1, "quantity": 1})
+        await hit("add_many_to_cart", "POST", "/cart/batch", headers=headers, json={
+            "items": [{"product_id": 2, "quantity": 1}, {"product_id": 3, "quantity": 2}],
+        })
+        await hit("view_cart", "GET", "/cart/", headers=headers)
+        await hit("checkout", "POST", "/cart/checkout", headers=headers)
+        await hit("add_to_cart", "POST", "/cart/", headers=headers, json={"product_id": 1, "quantity": 1})
+        await hit("checkout", "POST", "/cart/checkout", headers=headers)
+        page = (await hit("get_my_orders", "GET", "/users/orders?limit=1", headers=headers)).json()
+        await hit("get_my_orders", "GET", "/users/orders", headers=headers,
+                  params={"limit": 1, "before": page["next_cursor"], "start": "2000-01-01T00:00:00"})
+        await hit("revenue_by_day", "GET", "/analytics/revenue", headers=headers)
+        await hit("top_products", "GET", "/analytics/top-products?by=revenue&limit=3", headers=headers)
+        page = (await hit("product_sales", "GET", "/analytics/products?limit=1", headers=headers)).json()
+        await hit("product_sales", "GET", f"/analytics/products?limit=1&after={page['next_cursor']}", headers=headers)
+        await hit("product_sales_for", "GET", "/analytics/products/1", headers=headers)
+        await hit("delete_product", "DELETE", "/products/5", headers=headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    create_schema()
+
+    from app.database import engine
+    from app.main import app
+
+    captured = {"route": None, "statements": []}
+
+    # Listen on the Engine class so the read-only pool's statements are captured too
+    @event.listens_for(Engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        captured["statements"].append((captured["route"], statement, parameters))
+
+    asyncio.run(exercise(app, captured))
+    event.remove(Engine, "before_cursor_execute", capture)
+
+    failures = 0
+    seen = set()
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for route, statement, parameters in captured["statements"]:
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                continue
+            if (route, statement) in seen:
+                continue
+            seen.add((route, statement))
+
+            plan = [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            bad = is_regression(statement, plan)
+            failures += bad
+            if bad or args.verbose:
+                print(f"[{'SCAN' if bad else 'ok'}] {route}: {' '.join(statement.split())[:160]}")
+                for detail in plan:
+                    print(f"        {detail}")
+    finally:
+        raw.close()
+
+    print(f"{len(seen)} distinct statements checked, {failures} full-scan regression(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
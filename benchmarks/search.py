@@ -0,0 +1,83 @@
+"""
+/products/search latency as the catalog grows.
+
+Seeds --products synthetic products (the FTS triggers index them), then
+times ranked searches with and without price/stock filters.
+
+Usage:
+    python benchmarks/search.py [--products 200000] [--queries 200]
+"""
+import argparse
+import random
+import time
+
+from common import create_schema, percentile, use_temp_database
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike "
+    "november oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu"
+).split()
+
+
+def seed(count: int):
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import Product
+
+    rng = random.Random(1)
+    with SessionLocal() as db:
+        batch = []
+        for i in range(count):
+            batch.append({
+                "name": " ".join(rng.sample(WORDS, 2)) + f" {i}",
+                "description": " ".join(rng.choices(WORDS, k=8)),
+                "price": round(rng.uniform(1, 500), 2),
+                "stock": rng.randint(0, 20),
+            })
+            if len(batch) == 10000:
+                db.execute(insert(Product), batch)
+                batch.clear()
+        if batch:
+            db.execute(insert(Product), batch)
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temp_database()
+    create_schema()
+    start = time.perf_counter()
+    seed(args.products)
+    print(f"seeded {args.products} products in {time.perf_counter() - start:.1f}s")
+
+    from app.database import SessionLocal
+    from app.routers.products import _fts_query, _search_products
+
+    rng = random.Random(2)
+    scenarios = {
+        "text only": {},
+        "price range": {"min_price": 50.0, "max_price": 120.0},
+        "in stock": {"in_stock": True},
+    }
+    print(f"{'scenario':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    with SessionLocal() as db:
+        for name, filters in scenarios.items():
+            latencies = []
+            for _ in range(args.queries):
+                match = _fts_query(" ".join(rng.sample(WORDS, 2)))
+                start = time.perf_counter()
+                _search_products(
+                    db, match, filters.get("min_price"), filters.get("max_price"),
+                    filters.get("in_stock", False), 20, None
+                )
+                latencies.append(time.perf_counter() - start)
+            print(f"{name:<14}{percentile(latencies, 50) * 1000:>10.2f}"
+                  f"{percentile(latencies, 95) * 1000:>10.2f}{percentile(latencies, 99) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Response serialization CPU on 10k-row payloads: response_model vs projections.
+
+For each payload (a product page, a cart, an order-history page) the same
+--rows rows are loaded and serialized two ways:
+
+  before  ORM objects -> hand-built Pydantic models -> FastAPI's
+          response_model step (validate again, then dump to JSON)
+  after   column projection -> plain dicts -> FastJSONResponse (orjson)
+
+Reports CPU milliseconds (time.process_time, best of --repeat) for the
+query+build step and the serialization step separately, and fails if the
+two ways produce different bytes.
+
+Usage:
+    python benchmarks/serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import time
+
+from common import create_schema, use_temp_database
+
+use_temp_database()
+
+ORDERS = 100
+
+
+def seed(rows: int):
+    from sqlalchemy import insert, select
+    from app.database import SessionLocal
+    from app.models import CartItem, Order, OrderItem, Product, User
+
+    with SessionLocal() as db:
+        db.execute(insert(User), [{"email": "ser@example.com", "hashed_password": "x"}])
+        db.execute(insert(Product), [
+            {"name": f"Product {i}", "description": "serialization benchmark", "price": 1.5 + i, "stock": 10}
+            for i in range(rows)
+        ])
+        db.execute(insert(CartItem), [
+            {"user_id": 1, "product_id": i + 1, "quantity": 1 + i % 3} for i in range(rows)
+        ])
+        db.execute(insert(Order), [{"user_id": 1, "total_amount": 0.0} for _ in range(ORDERS)])
+        order_ids = list(db.scalars(select(Order.id)))
+        db.execute(insert(OrderItem), [
+            {"order_id": order_ids[i % ORDERS], "product_id": i + 1, "quantity": 1, "price": 1.5 + i}
+            for i in range(rows)
+        ])
+        db.commit()
+
+
+def best_cpu(fn, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    create_schema()
+    seed(args.rows)
+
+    from fastapi.routing import APIRoute, serialize_response
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+
+    from app.database import SessionLocal
+    from app.models import Order, Product
+    from app.routers import cart, products, users
+    from app.routers.cart import _cart_line_rows
+    from app.routers.users import _get_my_orders
+    from app.schemas import CartItemOut, OrderOut, ProductOut, ProductPage
+    from app.utils.serialization import FastJSONResponse, row_dicts
+
+    fields = {
+        route.path: route.response_field
+        for module in (cart, products, users)
+        for route in module.router.routes if isinstance(route, APIRoute) and "GET" in route.methods
+    }
+
+    loop = asyncio.new_event_loop()
+
+    def response_model_json(path: str, content):
+        return loop.run_until_complete(
+            serialize_response(field=fields[path], response_content=content, dump_json=True)
+        )
+
+    # Each payload: (route path, ORM+models builder, projection builder)
+    def products_before(db):
+        rows = db.query(Product).order_by(Product.id).limit(args.rows).all()
+        return ProductPage(items=[ProductOut.model_validate(row) for row in rows], next_cursor=None)
+
+    # Just the ProductOut columns (the catalog cache's projection also carries version/updated_at)
+    product_columns = select(*(getattr(Product, name) for name in ProductOut.model_fields))
+
+    def products_after(db):
+        rows = db.execute(product_columns.order_by(Product.id).limit(args.rows)).mappings()
+        return {"items": row_dicts(rows), "next_cursor": None}
+
+    def cart_before(db):
+        return [CartItemOut(**row) for row in _cart_line_rows(db, 1)]
+
+    def cart_after(db):
+        return _cart_line_rows(db, 1)
+
+    def orders_before(db):
+        orders = (
+            db.query(Order).options(selectinload(Order.items)).filter(Order.user_id == 1)
+            .order_by(Order.created_at.desc(), Order.id.desc()).all()
+        )
+        return {"items": [
+            OrderOut(id=o.id, total_amount=o.total_amount, created_at=o.created_at, items=[
+                CartItemOut(product_id=i.product_id, quantity=i.quantity,
+                            price_per_unit=i.price, total_price=i.price * i.quantity)
+                for i in o.items
+            ])
+            for o in orders
+        ], "next_cursor": None}
+
+    def orders_after(db):
+        return _get_my_orders(db, 1, ORDERS, None, None, None)
+
+    payloads = {
+        "products": ("/products/", products_before, products_after),
+        "cart": ("/cart/", cart_before, cart_after),
+        "orders": ("/users/orders", orders_before, orders_after),
+    }
+
+    print(f"{args.rows} rows per payload, CPU ms (best of {args.repeat})")
+    print(f"{'payload':<10}{'':<8}{'query+build':>13}{'serialize':>11}{'total':>9}{'bytes':>10}")
+    for name, (path, before, after) in payloads.items():
+        bodies = {}
+        for label, build, serialize in (
+            ("before", before, lambda content: response_model_json(path, content)),
+            ("after", after, lambda content: FastJSONResponse(content).body),
+        ):
+            with SessionLocal() as db:
+                build_ms, content = best_cpu(lambda: build(db), args.repeat)
+            serialize_ms, body = best_cpu(lambda: serialize(content), args.repeat)
+            bodies[label] = body
+            print(f"{name:<10}{label:<8}{build_ms:>13.1f}{serialize_ms:>11.1f}"
+                  f"{build_ms + serialize_ms:>9.1f}{len(body):>10}")
+        assert bodies["before"] == bodies["after"], f"{name}: before and after responses differ"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Mixed read/write throughput of the production SQLite engine profile vs SQLite defaults.
+
+Each worker thread loops for --seconds, doing a product read or a stock update
+(--write-ratio of the time), each in its own session and transaction, the
+way the routers do. Reports operations/sec and "database is locked" errors.
+
+Usage:
+    python benchmarks/sqlite_profile.py [--threads 16] [--seconds 5] [--write-ratio 0.2]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from common import percentile, use_temp_database
+
+use_temp_database()
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base, create_db_engine
+
+PRODUCTS = 1000
+
+
+def seed(engine):
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all(
+            models.Product(name=f"Product {i}", description="", price=1.0 + i, stock=1_000_000)
+            for i in range(PRODUCTS)
+        )
+        db.commit()
+
+
+def run_profile(profile: str, threads: int, seconds: float, write_ratio: float) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="shop-profile-"), "shop.db")
+    engine = create_db_engine(f"sqlite:///{path}", profile=profile)
+    seed(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    ops, locked, latencies = [0], [0], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        local_ops, local_locked, local_latencies = 0, 0, []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    if rng.random() < write_ratio:
+                        db.query(models.Product).filter(
+                            models.Product.id == rng.randint(1, PRODUCTS)
+                        ).update({models.Product.stock: models.Product.stock - 1})
+                        db.commit()
+                    else:
+                        db.get(models.Product, rng.randint(1, PRODUCTS))
+                local_ops += 1
+            except OperationalError:
+                local_locked += 1
+            local_latencies.append(time.perf_counter() - start)
+        with lock:
+            ops[0] += local_ops
+            locked[0] += local_locked
+            latencies.extend(local_latencies)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    engine.dispose()
+
+    return {
+        "profile": profile,
+        "ops_per_sec": ops[0] / seconds,
+        "locked_errors": locked[0],
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{'profile':<12}{'ops/s':>10}{'locked':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    for profile in ("default", "production"):
+        r = run_profile(profile, args.threads, args.seconds, args.write_ratio)
+        print(f"{r['profile']:<12}{r['ops_per_sec']:>10.0f}{r['locked_errors']:>9}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
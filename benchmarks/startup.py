@@ -0,0 +1,115 @@
+"""
+Cold start: import time, app construction and time to first request.
+
+Each run starts a fresh interpreter that imports app.main, calls
+create_app(), runs the lifespan startup and serves one authenticated
+GET /products/{id} in-process. Also times a no-op `alembic upgrade head`,
+which is what every boot paid before migrations became a separate step
+(RUN_MIGRATIONS). Reports the median of --runs.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--importtime]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import ROOT, create_schema, use_temp_database
+
+CHILD = """
+import asyncio, json, os, time
+import httpx
+
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+application = app.main.create_app()
+created = time.perf_counter()
+
+async def first_request():
+    async with application.router.lifespan_context(application):
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/products/1", headers={"Authorization": "Bearer " + os.environ["TOKEN"]})
+            assert response.status_code == 200, response.text
+
+asyncio.run(first_request())
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "total_ms": (served - start) * 1000,
+}))
+"""
+
+
+def seed() -> str:
+    from app.database import SessionLocal
+    from app.models import Product, User
+    from app.utils.jwt import create_access_token
+
+    with SessionLocal() as db:
+        user = User(email="startup@example.com", hashed_password="x")
+        db.add_all([user, Product(name="Startup widget", description="", price=1.0, stock=1)])
+        db.commit()
+        return create_access_token({"sub": str(user.id)})
+
+
+def run_child(env: dict) -> dict:
+    result = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def time_migrations(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT, env=env, capture_output=True, check=True
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def print_importtime(env: dict, top: int = 15):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main; app.main.create_app()"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        rows.append((int(self_us), int(cumulative_us), name))
+    print(f"\nslowest imports by self time (of {len(rows)} modules)")
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {self_us / 1000:>7.1f} ms self {cumulative_us / 1000:>8.1f} ms cumulative  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    args = parser.parse_args()
+
+    use_temp_database()
+    create_schema()
+    env = {**os.environ, "TOKEN": seed(), "PYTHONPATH": ROOT}
+
+    runs = [run_child(env) for _ in range(args.runs)]
+    print(f"cold start, median of {args.runs} runs")
+    for key in ("import_ms", "create_app_ms", "first_request_ms", "total_ms"):
+        print(f"  {key:<18}{statistics.median(run[key] for run in runs):>9.1f}")
+    print(f"  {'alembic upgrade':<18}{time_migrations(env):>9.1f}  (no-op at head; skipped with RUN_MIGRATIONS=0)")
+
+    if args.importtime:
+        print_importtime(env)
+
+
+if __name__ == "__main__":
+    main()
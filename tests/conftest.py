@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+import pytest
+
+# app.config reads the environment when it is first imported: point the app
+# at a throwaway database before any test module imports it
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="shop-test-"), "shop.db")
+os.environ.setdefault("OUTBOX_WORKER_ENABLED", "0")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.database import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(engine)
+    with TestClient(app) as test_client:
+        yield test_client
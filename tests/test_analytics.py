@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.analytics import rebuild, record_order
+from app.database import Base
+from app.models import DailyRevenue, Order, OrderItem, Product, ProductSales, User
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'shop.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def _place_order(db, user, lines):
+    order_time = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+    order = Order(user_id=user.id, total_amount=sum(p.price * q for p, q in lines), created_at=order_time)
+    db.add(order)
+    db.flush()
+    for product, quantity in lines:
+        db.add(OrderItem(order_id=order.id, product_id=product.id, quantity=quantity, price=product.price))
+    record_order(db, order_time.date(), order.total_amount, {p.id: (q, p.price) for p, q in lines})
+    db.commit()
+
+
+def test_rebuild_after_product_delete(db):
+    user = User(email="a@example.com", hashed_password="x")
+    kept = Product(name="Kept", price=10.0, stock=5)
+    gone = Product(name="Gone", price=4.0, stock=5)
+    db.add_all([user, kept, gone])
+    db.commit()
+    _place_order(db, user, [(kept, 2), (gone, 3)])
+    gone_id = gone.id
+
+    # The ORM nulls order_items.product_id of the deleted product
+    db.delete(gone)
+    db.commit()
+    assert db.query(OrderItem).filter(OrderItem.product_id.is_(None)).count() == 1
+
+    counts = rebuild(db)
+
+    assert counts == {"days": 1, "products": 2}
+    sales = {row.product_id: (row.orders, row.units, row.revenue) for row in db.query(ProductSales)}
+    assert sales == {kept.id: (1, 2, 20.0), gone_id: (1, 3, 12.0)}
+    day = db.query(DailyRevenue).one()
+    assert (day.orders, day.units, day.revenue) == (1, 5, 32.0)
+
+
+def test_record_order_rejects_non_positive_quantities(db):
+    with pytest.raises(ValueError):
+        record_order(db, datetime(2026, 10, 18).date(), -10.0, {1: (-1, 10.0)})
+
+
+def test_new_product_does_not_inherit_deleted_products_sales(db):
+    user = User(email="b@example.com", hashed_password="x")
+    gone = Product(name="Gone", price=4.0, stock=5)
+    db.add_all([user, gone])
+    db.commit()
+    _place_order(db, user, [(gone, 1)])
+    gone_id = gone.id
+    db.delete(gone)
+    db.commit()
+
+    new = Product(name="New", price=6.0, stock=5)
+    db.add(new)
+    db.commit()
+
+    assert new.id != gone_id
+    assert db.get(ProductSales, new.id) is None
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+from itertools import count
+
+import pytest
+from sqlalchemy import update
+
+from app import inventory
+from app.database import SessionLocal
+from app.models import CartItem, Product, StockReservation, User
+from app.schemas import OrderOut
+from app.utils.jwt import create_access_token, decode_access_token
+
+_emails = count()
+
+
+def _user() -> dict:
+    with SessionLocal() as db:
+        user = User(email=f"shopper{next(_emails)}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+
+
+def _user_id(headers: dict) -> int:
+    return int(decode_access_token(headers["Authorization"].split()[1])["sub"])
+
+
+def _product(stock: int) -> int:
+    with SessionLocal() as db:
+        product = Product(name="Last units", price=5.0, stock=stock)
+        db.add(product)
+        db.commit()
+        return product.id
+
+
+def _stock(product_id: int) -> int:
+    with SessionLocal() as db:
+        return db.get(Product, product_id).stock
+
+
+@pytest.fixture
+def sweep_every_request(monkeypatch):
+    monkeypatch.setattr(inventory, "STOCK_SWEEP_INTERVAL_SECONDS", 0)
+
+
+def test_expired_holds_are_released_before_taking_stock(client, sweep_every_request):
+    product_id = _product(stock=2)
+    first, second = _user(), _user()
+    assert client.post("/cart/", json={"product_id": product_id, "quantity": 2}, headers=first).status_code == 200
+    assert _stock(product_id) == 0
+
+    with SessionLocal() as db:
+        db.execute(update(StockReservation).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        db.commit()
+
+    # Only the expired hold stands between the second shopper and the stock
+    response = client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=second)
+
+    assert response.status_code == 200
+    assert _stock(product_id) == 1
+    with SessionLocal() as db:
+        holds = db.query(StockReservation.quantity).filter(StockReservation.product_id == product_id).all()
+    assert holds == [(1,)]
+
+
+def test_sweep_survives_a_rejected_request(client, sweep_every_request):
+    product_id = _product(stock=2)
+    first, second = _user(), _user()
+    assert client.post("/cart/", json={"product_id": product_id, "quantity": 2}, headers=first).status_code == 200
+
+    with SessionLocal() as db:
+        db.execute(update(StockReservation).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        db.commit()
+
+    # More than was ever in stock: the add fails, but the expired units are back
+    response = client.post("/cart/", json={"product_id": product_id, "quantity": 3}, headers=second)
+
+    assert response.status_code == 409
+    assert _stock(product_id) == 2
+
+
+def test_deleting_a_product_drops_its_holds(client):
+    product_id = _product(stock=5)
+    shopper = _user()
+    assert client.post("/cart/", json={"product_id": product_id, "quantity": 2}, headers=shopper).status_code == 200
+
+    assert client.delete(f"/products/{product_id}", headers=shopper).status_code == 200
+
+    with SessionLocal() as db:
+        assert db.query(StockReservation).filter(StockReservation.product_id == product_id).count() == 0
+
+
+def test_checkout_after_a_product_in_the_cart_is_deleted(client):
+    kept, gone = _product(stock=5), _product(stock=5)
+    shopper = _user()
+    for product_id in (kept, gone):
+        assert client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=shopper).status_code == 200
+
+    assert client.delete(f"/products/{gone}", headers=shopper).status_code == 200
+    # A line orphaned before deletes cleared cart lines
+    with SessionLocal() as db:
+        db.add(CartItem(user_id=_user_id(shopper), product_id=None, quantity=1))
+        db.commit()
+
+    response = client.post("/cart/checkout", headers=shopper)
+
+    assert response.status_code == 200
+    assert [item["product_id"] for item in response.json()["items"]] == [kept]
+    assert client.get("/cart/", headers=shopper).json() == []
+
+
+def test_order_history_keeps_lines_of_deleted_products(client):
+    product_id = _product(stock=5)
+    shopper = _user()
+    assert client.post("/cart/", json={"product_id": product_id, "quantity": 2}, headers=shopper).status_code == 200
+    assert client.post("/cart/checkout", headers=shopper).status_code == 200
+    assert client.delete(f"/products/{product_id}", headers=shopper).status_code == 200
+
+    response = client.get("/users/orders", headers=shopper)
+
+    assert response.status_code == 200
+    [order] = response.json()["items"]
+    assert OrderOut.model_validate(order).items[0].product_id is None
+    assert order["items"][0]["quantity"] == 2